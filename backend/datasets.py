@@ -0,0 +1,243 @@
+"""
+Memory-mapped dataset cache shared by every process on the host.
+
+A loader converts a dataset CSV into a .npy structured array sorted by
+(region, year) and publishes it as an immutable, versioned file
+(`<stem>.<content-hash>.npy`). A small JSON pointer file (`<stem>.current`)
+names the live version. Readers (uvicorn workers, scenario worker
+processes) follow the pointer and np.load(..., mmap_mode="r") the file, so
+every process shares the OS page cache instead of holding its own copy.
+
+Publishing is the loader's job: the app publishes every dataset in a
+background thread at startup, and `python -m backend.datasets` republishes
+after the CSVs are refreshed. Readers only follow the pointer; they publish
+solely to bootstrap a cold cache, and always run off the event loop.
+
+Refreshing a dataset writes the new version under a temp name, renames it
+into place, and only then swaps the pointer with os.replace. Readers see
+either the old version or the new one, never a partial file. Mappings that
+are already open keep working after a swap. A long-running reader (e.g. a
+scenario sweep) pins its version so a later publish does not prune it.
+
+    python -m backend.datasets          # (re)publish every dataset
+"""
+import csv
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+
+# numpy is imported lazily to keep app startup light
+if TYPE_CHECKING:
+    import numpy as np
+
+# Directory holding the dataset CSVs (override via env var, e.g. for load tests)
+DATA_DIR = Path(os.getenv("RUNNER_DATA_DIR", Path(__file__).parent / "data"))
+CACHE_DIR = DATA_DIR / "cache"
+
+YIELD_CSV_PATH = DATA_DIR / "yield_data.csv"
+WATER_CSV_PATH = DATA_DIR / "water_risk_data.csv"
+DATASETS = (YIELD_CSV_PATH, WATER_CSV_PATH)
+
+# Published versions kept per dataset (plus any pinned); older ones are removed on publish
+KEEP_VERSIONS = 2
+
+
+def _pointer_path(csv_path: Path, cache_dir: Path) -> Path:
+    return cache_dir / f"{csv_path.stem}.current"
+
+
+def _source_signature(csv_path: Path) -> Tuple[int, int]:
+    st = os.stat(csv_path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read_pointer(csv_path: Path, cache_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads(_pointer_path(csv_path, cache_dir).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _atomic_write(path: Path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _build_array(raw: bytes) -> "np.ndarray":
+    """CSV bytes -> structured array: region (str), year (int), other columns float."""
+    import numpy as np
+
+    reader = csv.DictReader(raw.decode("utf-8").splitlines())
+    numeric = [c for c in reader.fieldnames or [] if c not in ("region", "year")]
+    rows = [
+        (row["region"], int(row["year"]), *(float(row[c] or 0) for c in numeric))
+        for row in reader
+    ]
+    region_len = max((len(r[0]) for r in rows), default=1)
+    arr = np.array(rows, dtype=[
+        ("region", f"U{region_len}"),
+        ("year", "i4"),
+        *((c, "f8") for c in numeric),
+    ])
+    arr.sort(order=["region", "year"])
+    return arr
+
+
+def pid_alive(pid: int) -> bool:
+    """True if a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_pinned(npy_path: Path) -> bool:
+    """True if a live process holds a pin on npy_path; pins of dead processes are removed."""
+    pinned = False
+    for pin_path in npy_path.parent.glob(f"{npy_path.name}.*.pin"):
+        pid = pin_path.name[len(npy_path.name) + 1:].split("-", 1)[0]
+        if pid.isdigit() and pid_alive(int(pid)):
+            pinned = True
+        else:
+            pin_path.unlink(missing_ok=True)
+    return pinned
+
+
+def _prune(csv_path: Path, cache_dir: Path, keep: Iterable[str]):
+    keep = set(keep)
+    for old in cache_dir.glob(f"{csv_path.stem}.*.npy"):
+        if old.name not in keep and not _is_pinned(old):
+            try:
+                old.unlink()
+            except OSError:
+                pass  # still mapped on platforms that forbid unlinking open files
+
+
+def publish(csv_path: Path, cache_dir: Optional[Path] = None, force: bool = False) -> Path:
+    """
+    Publish csv_path into the cache if the source changed since the current
+    version (or force=True). Returns the live versioned .npy path. Safe to
+    call concurrently from several processes: identical content maps to the
+    same file name and every write is rename-into-place.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    pointer = _read_pointer(csv_path, cache_dir)
+    signature = list(_source_signature(csv_path))
+    if (
+        not force
+        and pointer is not None
+        and pointer["source"] == signature
+        and (cache_dir / pointer["file"]).exists()
+    ):
+        return cache_dir / pointer["file"]
+
+    import numpy as np
+
+    raw = csv_path.read_bytes()
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    npy_path = cache_dir / f"{csv_path.stem}.{version}.npy"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if not npy_path.exists():
+        tmp_path = npy_path.with_name(f"{npy_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, _build_array(raw))
+        os.replace(tmp_path, npy_path)
+
+    previous = pointer["file"] if pointer else None
+    _atomic_write(
+        _pointer_path(csv_path, cache_dir),
+        json.dumps({"file": npy_path.name, "version": version, "source": signature}).encode(),
+    )
+    _prune(csv_path, cache_dir, keep=[npy_path.name, previous][:KEEP_VERSIONS])
+    return npy_path
+
+
+# Per-process mappings: dataset stem -> (versioned file, read-only memmap).
+# Only the most recently opened version of each dataset is cached; arrays a
+# caller still holds stay valid after eviction.
+_MAPPED: Dict[str, Tuple[str, "np.ndarray"]] = {}
+
+
+def open_version(npy_path) -> "np.ndarray":
+    """Read-only memmap of a published version; versions never change once written."""
+    import numpy as np
+
+    key = str(npy_path)
+    stem = Path(key).name.rsplit(".", 2)[0]
+    cached = _MAPPED.get(stem)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    arr = np.load(key, mmap_mode="r")
+    _MAPPED[stem] = (key, arr)
+    return arr
+
+
+def current_version(csv_path: Path, cache_dir: Optional[Path] = None) -> Path:
+    """
+    Path of the live version (one small pointer read). Refreshes are
+    published by the loader; this only publishes when the cache is cold.
+    Blocking: call it off the event loop.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    pointer = _read_pointer(csv_path, cache_dir)
+    if pointer is not None:
+        npy_path = cache_dir / pointer["file"]
+        if npy_path.exists():
+            return npy_path
+    return publish(csv_path, cache_dir)
+
+
+def attach(csv_path: Path, cache_dir: Optional[Path] = None) -> "np.ndarray":
+    """Read-only shared view of the live version of a dataset."""
+    return open_version(current_version(csv_path, cache_dir))
+
+
+def pin_current(csv_path: Path, cache_dir: Optional[Path] = None) -> Tuple[Path, Path]:
+    """
+    Pin the live version so publish() will not prune it while it is in use,
+    e.g. by scenario worker processes that open it later. Returns
+    (npy_path, pin_path); release with unpin(pin_path).
+    """
+    while True:
+        npy_path = current_version(csv_path, cache_dir)
+        pin_path = npy_path.with_name(f"{npy_path.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}.pin")
+        pin_path.touch()
+        if npy_path.exists():
+            return npy_path, pin_path
+        pin_path.unlink(missing_ok=True)  # pruned before the pin landed; take the new version
+
+
+def unpin(pin_path: Path):
+    pin_path.unlink(missing_ok=True)
+
+
+def select_rows(arr: "np.ndarray", region: str, year: int) -> "np.ndarray":
+    """Rows for region & year, by binary search on the (region, year) sort order."""
+    import numpy as np
+
+    regions = arr["region"]
+    lo = int(np.searchsorted(regions, region, side="left"))
+    hi = int(np.searchsorted(regions, region, side="right"))
+    years = arr["year"][lo:hi]
+    return arr[
+        lo + int(np.searchsorted(years, year, side="left")):
+        lo + int(np.searchsorted(years, year, side="right"))
+    ]
+
+
+def publish_all(force: bool = False):
+    for csv_path in DATASETS:
+        publish(csv_path, force=force)
+
+
+if __name__ == "__main__":
+    for csv_path in DATASETS:
+        print(f"{csv_path.name} -> {publish(csv_path, force=True)}")
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import os
+import socket
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
+from sqlalchemy import func
 from sqlmodel import SQLModel, Session, create_engine, select
 
-from .models.db_models import ModelInfo, Run, RunResult
+from .datasets import pid_alive
+from .models.db_models import ModelInfo, Run, RunResult, RunResultChunk
 
 # Build an absolute path to backend/data/runs.db
 BASE_DIR = Path(__file__).resolve().parent  # backend/
@@ -14,13 +18,65 @@ DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
 DB_PATH = DATA_DIR / "runs.db"
-DB_URL = f"sqlite:///{DB_PATH.as_posix()}"
+# Override via env var, e.g. to point load tests at a throwaway database
+DB_URL = os.getenv("RUNNER_DB_URL", f"sqlite:///{DB_PATH.as_posix()}")
 
 engine = create_engine(DB_URL, echo=False)
 
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+def _migrate_runs_table():
+    """
+    create_all() never alters existing tables; add columns introduced after
+    a runs.db was first created. Every uvicorn worker runs this at startup,
+    so the check and the ALTER happen under one write lock (BEGIN IMMEDIATE):
+    a worker that waited for the lock sees the column already added.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            _add_missing_run_columns(conn)
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+
+
+def _add_missing_run_columns(conn):
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(runs)")}
+    if "status_version" not in columns:
+        conn.exec_driver_sql(
+            "ALTER TABLE runs ADD COLUMN status_version INTEGER NOT NULL DEFAULT 0"
+        )
+        conn.exec_driver_sql("UPDATE runs SET status_version = id")
+        # the indexes create_all() would have made on a fresh runs table
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_runs_status_version ON runs (status_version)"
+        )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_runs_user_status_version "
+            "ON runs (user_id, status_version)"
+        )
+    if "worker_id" not in columns:
+        conn.exec_driver_sql("ALTER TABLE runs ADD COLUMN worker_id VARCHAR")
+
+
+def _next_status_version():
+    """
+    SQL expression for the next runs.status_version. Evaluated inside the
+    INSERT/UPDATE itself, so SQLite's write lock keeps versions unique and
+    in commit order.
+    """
+    return (
+        select(func.coalesce(func.max(Run.status_version), 0) + 1)
+        .scalar_subquery()
+    )
+
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    _migrate_runs_table()
     # Seed models if not present
     with Session(engine) as session:
         existing = session.exec(select(ModelInfo)).all()
@@ -40,6 +96,15 @@ def init_db():
             session.commit()
 
 
+def list_model_infos() -> List[ModelInfo]:
+    with Session(engine) as session:
+        return session.exec(select(ModelInfo)).all()
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
 def create_run(model_id: str, user_id: str, params: Dict[str, Any]) -> int:
     """
     Create a run; params persist as JSON (dict).
@@ -49,6 +114,8 @@ def create_run(model_id: str, user_id: str, params: Dict[str, Any]) -> int:
         user_id=user_id,
         status="queued",
         params_json=params,  # ← no json.dumps; JSON field stores dict
+        status_version=_next_status_version(),
+        worker_id=_worker_id(),
     )
     with Session(engine) as session:
         session.add(run)
@@ -59,6 +126,31 @@ def create_run(model_id: str, user_id: str, params: Dict[str, Any]) -> int:
         return run.id
 
 
+def fail_orphaned_runs() -> int:
+    """
+    Mark queued/running runs whose API process is gone (crash, restart,
+    deploy) as failed; their in-memory queue entries and tasks died with it.
+    Runs of live processes on this host are left alone; runs queued on
+    another host (e.g. a previous container) count as orphaned. Returns the
+    number of runs failed.
+    """
+    host = socket.gethostname()
+    with Session(engine) as session:
+        active = session.exec(
+            select(Run).where(Run.status.not_in(TERMINAL_STATUSES))
+        ).all()
+    orphaned = []
+    for run in active:
+        run_host, _, pid = (run.worker_id or "").rpartition(":")
+        if run_host == host and pid.isdigit() and pid_alive(int(pid)):
+            continue
+        orphaned.append(run.id)
+    for run_id in orphaned:
+        save_run_result(run_id, {"error": "Interrupted: the server process running this run exited"}, [])
+        update_run_status(run_id, "failed")
+    return len(orphaned)
+
+
 def get_runs_for_user(user_id: str):
     with Session(engine) as session:
         statement = (
@@ -69,13 +161,53 @@ def get_runs_for_user(user_id: str):
         return session.exec(statement).all()
 
 
+def count_active_runs(user_id: str, model_id: Optional[str] = None) -> int:
+    """
+    Queued + running runs for a user (optionally of one model). Read from
+    the runs table so the cap holds across every worker process.
+    """
+    with Session(engine) as session:
+        stmt = (
+            select(func.count())
+            .select_from(Run)
+            .where(Run.user_id == user_id, Run.status.not_in(TERMINAL_STATUSES))
+        )
+        if model_id is not None:
+            stmt = stmt.where(Run.model_id == model_id)
+        return session.exec(stmt).one()
+
+
+def get_run_statuses(
+    user_id: str,
+    run_ids: Optional[List[int]] = None,
+    active_only: bool = False,
+    since: Optional[int] = None,
+) -> List[Run]:
+    """
+    One query over (user_id, status_version) for bulk status polling.
+    Runs owned by other users are simply not returned. With a `since`
+    cursor, active_only still returns runs that finished after the cursor,
+    so pollers see their final status.
+    """
+    with Session(engine) as session:
+        stmt = select(Run).where(Run.user_id == user_id)
+        if run_ids is not None:
+            stmt = stmt.where(Run.id.in_(run_ids))
+        if since is not None:
+            stmt = stmt.where(Run.status_version > since)
+        elif active_only:
+            stmt = stmt.where(Run.status.not_in(TERMINAL_STATUSES))
+        return session.exec(stmt.order_by(Run.status_version)).all()
+
+
 def update_run_status(run_id: int, new_status: str):
     with Session(engine) as session:
         run = session.get(Run, run_id)
         if not run:
             return
         run.status = new_status
-        if new_status in ["succeeded", "failed"]:
+        run.status_version = _next_status_version()
+        if new_status in TERMINAL_STATUSES:
             run.finished_at = datetime.utcnow()
         session.add(run)
         session.commit()
@@ -109,6 +241,42 @@ def save_run_result(
         session.commit()
 
 
+def save_run_result_chunk(
+    run_id: int,
+    chunk_index: int,
+    table_rows: List[Dict[str, Any]],
+):
+    """
+    Append one chunk of table rows for a scenario run.
+    """
+    with Session(engine) as session:
+        session.merge(
+            RunResultChunk(
+                run_id=run_id,
+                chunk_index=chunk_index,
+                rows_json=table_rows,
+            )
+        )
+        session.commit()
+
+
+def get_run_result_chunks(
+    run_id: int,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> List[RunResultChunk]:
+    with Session(engine) as session:
+        stmt = (
+            select(RunResultChunk)
+            .where(RunResultChunk.run_id == run_id)
+            .order_by(RunResultChunk.chunk_index)
+            .offset(offset)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return session.exec(stmt).all()
+
+
 def get_run_for_user(run_id: int, user_id: str) -> Optional[Run]:
     with Session(engine) as session:
         run = session.get(Run, run_id)
@@ -1,19 +1,24 @@
 import json
+import os
 import asyncio
-import pandas as pd
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from sqlmodel import Session, select
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import List, Optional
 from .auth import get_current_user
 from .db import (
     init_db,
+    fail_orphaned_runs,
     create_run,
     get_run_for_user,
     get_runs_for_user,
     get_run_result,
     update_run_status,
     get_run_by_id,
+    get_run_result_chunks,
+    list_model_infos,
+    get_run_statuses,
 )
 
 # Tables (ORM)
@@ -21,20 +26,65 @@ from .models.db_models import ModelInfo, Run, RunResult
 
 # Schemas (API I/O)
 from .models.schemas import (    
-    RunRequest, RunCreatedResponse, RunStatusResponse, RunResultsResponse, ModelListItem,  # Schemas
+    RunRequest, RunCreatedResponse, RunStatusResponse, RunResultsResponse, ModelListItem, ScenarioRequest,  # Schemas
+    CompositeRunRequest,
 )
     
-from .db import engine
-from .runner import execute_model_async
+from .scheduler import scheduler
+from .datasets import publish_all
+from .profiling import should_profile, profile_path, collapsed_stacks
+from .runner import (
+    execute_model_async, execute_scenario_async, execute_composite_async,
+    plan_composite_waves, shutdown_scenario_pool,
+    SCENARIO_MODELS, SCENARIO_CHUNK_SIZE_MAX, YIELD_CSV_PATH, COMPOSITE_MODEL_ID,
+)
 from pathlib import Path
 
 # import the sync runner
 #from .runner import execute_model
 
+# Pre-load the region list in a background thread once the app is serving (opt-in)
+WARM_CACHES_ON_STARTUP = os.getenv("WARM_CACHES_ON_STARTUP", "0") == "1"
+
+
+def _warm_caches():
+    try:
+        _load_regions(YIELD_CSV_PATH)
+    except Exception as e:
+        print("Cache warm-up failed:", repr(e))
+
+
+def _publish_datasets():
+    # no-op for datasets whose CSV is unchanged since the last publish
+    try:
+        publish_all()
+    except Exception as e:
+        print("Dataset publish failed:", repr(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation + seeding run once per worker at startup, not at import time
+    init_db()
+    # runs queued by a previous process would otherwise stay active (and count
+    # against the per-user cap) forever
+    fail_orphaned_runs()
+    # the loader side of the dataset cache: publish off the event loop, without delaying startup
+    background = [asyncio.create_task(asyncio.to_thread(_publish_datasets))]
+    if WARM_CACHES_ON_STARTUP:
+        background.append(asyncio.create_task(asyncio.to_thread(_warm_caches)))
+    yield
+    for task in background:
+        if not task.done():
+            task.cancel()
+    shutdown_scenario_pool()
+
+
 app = FastAPI(
     title="Model Runner API",
     description="Internal dashboard backend for running and tracking analytical models.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -45,7 +95,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-init_db()
+# data_path -> (mtime_ns, regions); refreshed when the CSV changes
+_regions_cache = {}
+
+
+def _load_regions(data_path: Path) -> List[str]:
+    mtime = data_path.stat().st_mtime_ns
+    cached = _regions_cache.get(data_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    import pandas as pd  # heavy import, only needed here
+
+    df = pd.read_csv(data_path)
+    print("CSV columns:", list(df.columns))
+
+    # adjust this column name if needed
+    if "region" not in df.columns:
+        raise HTTPException(
+            status_code=500,
+            detail=f"'region' column not found in CSV. Columns are: {list(df.columns)}"
+        )
+
+    regions = sorted(df["region"].unique().tolist())
+    _regions_cache[data_path] = (mtime, regions)
+    return regions
+
 
 @app.get("/api/regions")
 def get_regions(current_user: str = Depends(get_current_user)):
@@ -54,8 +129,7 @@ def get_regions(current_user: str = Depends(get_current_user)):
     This powers the frontend dropdown so users don't have to guess region names.
     """
     try:
-        # Build an absolute path to backend/data/yield_data.csv
-        data_path = Path(__file__).resolve().parent / "data" / "yield_data.csv"
+        data_path = YIELD_CSV_PATH
         print("Reading region list from:", data_path)
 
         if not data_path.exists():
@@ -64,18 +138,7 @@ def get_regions(current_user: str = Depends(get_current_user)):
                 detail=f"Dataset not found at {data_path}"
             )
 
-        df = pd.read_csv(data_path)
-        print("CSV columns:", list(df.columns))
-
-        # adjust this column name if needed
-        if "region" not in df.columns:
-            raise HTTPException(
-                status_code=500,
-                detail=f"'region' column not found in CSV. Columns are: {list(df.columns)}"
-            )
-
-        regions = sorted(df["region"].unique().tolist())
-        return {"regions": regions}
+        return {"regions": _load_regions(data_path)}
 
     except HTTPException:
         # re-raise on purpose so FastAPI uses your message
@@ -88,22 +151,33 @@ def get_regions(current_user: str = Depends(get_current_user)):
         )
 @app.get("/api/models", response_model=List[ModelListItem])
 def list_models(current_user: str = Depends(get_current_user)):
-    with Session(engine) as session:
-        rows = session.exec(select(ModelInfo)).all()
-        return [
-            ModelListItem(
-                model_id=r.model_id,
-                name=r.name,
-                description=r.description
-            )
-            for r in rows
-        ]
+    rows = list_model_infos()
+    return [
+        ModelListItem(
+            model_id=r.model_id,
+            name=r.name,
+            description=r.description
+        )
+        for r in rows
+    ]
 
 @app.post("/api/runs", response_model=RunCreatedResponse)
 async def submit_run(
     req: RunRequest,
+    profile: bool = False,
+    x_profile: bool = Header(default=False),
     current_user: str = Depends(get_current_user)
 ):
+    """
+    Submit a run. Pass `?profile=true` or `x-profile: true` to capture a
+    cProfile trace, available afterwards at /api/runs/{id}/profile.
+    """
+    if req.model_id == COMPOSITE_MODEL_ID:
+        raise HTTPException(
+            status_code=400,
+            detail="Composite runs are submitted via POST /api/runs/composite"
+        )
+    scheduler.admit(current_user, req.model_id)
     params = {
         "region": req.region,
         "year": req.year,        
@@ -113,8 +187,91 @@ async def submit_run(
         user_id=current_user,
         params=params,
     )
-    asyncio.create_task(
-        execute_model_async(run_id, req.model_id, params)
+    profile = should_profile(profile or x_profile)
+    scheduler.submit(
+        current_user,
+        lambda: execute_model_async(run_id, req.model_id, params, profile=profile),
+    )
+    return RunCreatedResponse(run_id=run_id)
+
+
+@app.post("/api/runs/composite", response_model=RunCreatedResponse)
+async def submit_composite_run(
+    req: CompositeRunRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Submit a composite run: a small DAG of registered models for one
+    region/year (e.g. crop_yield_predictor + water_risk). The joined result
+    is stored as a single RunResult, on a run whose model_id is the
+    "composite" sentinel (not listed by /api/models).
+    """
+    steps = [s.model_dump() for s in req.steps]
+    if not steps:
+        raise HTTPException(status_code=422, detail="Composite run needs at least one step")
+    try:
+        plan_composite_waves(steps)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    scheduler.admit(current_user, COMPOSITE_MODEL_ID)
+
+    params = {
+        "region": req.region,
+        "year": req.year,
+        "steps": steps,
+    }
+    run_id = create_run(
+        model_id=COMPOSITE_MODEL_ID,
+        user_id=current_user,
+        params=params,
+    )
+    scheduler.submit(
+        current_user,
+        lambda: execute_composite_async(run_id, params),
+    )
+    return RunCreatedResponse(run_id=run_id)
+
+
+@app.post("/api/scenarios", response_model=RunCreatedResponse)
+async def submit_scenario(
+    req: ScenarioRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Submit a parameter sweep. Every combination in `grid` is evaluated;
+    rows stream into the run's results as chunks finish.
+    """
+    if req.model_id not in SCENARIO_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Scenario sweeps are not supported for model '{req.model_id}'"
+        )
+    missing = {"region", "year"} - set(req.grid)
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Scenario grid is missing: {sorted(missing)}"
+        )
+    if req.chunk_size is not None and not 1 <= req.chunk_size <= SCENARIO_CHUNK_SIZE_MAX:
+        raise HTTPException(
+            status_code=422,
+            detail=f"chunk_size must be between 1 and {SCENARIO_CHUNK_SIZE_MAX}"
+        )
+    scheduler.admit(current_user, req.model_id)
+
+    params = {
+        "scenario": True,
+        "grid": req.grid,
+        "chunk_size": req.chunk_size,
+    }
+    run_id = create_run(
+        model_id=req.model_id,
+        user_id=current_user,
+        params=params,
+    )
+    scheduler.submit(
+        current_user,
+        lambda: execute_scenario_async(run_id, req.model_id, req.grid, req.chunk_size),
     )
     return RunCreatedResponse(run_id=run_id)
 
@@ -134,6 +291,48 @@ def list_runs(current_user: str = Depends(get_current_user)):
     return response    
 
 
+def _status_payload(run: Run) -> dict:
+    return {
+        "run_id": run.id,
+        "model_id": run.model_id,
+        "status": run.status,
+        "status_version": run.status_version,
+        "started_at": run.created_at.isoformat() if run.created_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+    }
+
+
+# Upper bound on explicit ids per bulk status call
+MAX_BULK_STATUS_IDS = 500
+
+
+@app.get("/api/runs/status")
+def get_bulk_status(
+    ids: Optional[List[int]] = Query(default=None),
+    active: bool = False,
+    since: Optional[int] = None,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Status of many runs in one query: `?ids=1&ids=2`, or `?active=true` for
+    all of the caller's unfinished runs (no filter = all of the caller's runs).
+    Pass the returned `cursor` as `since` on the next call to receive only
+    runs whose status changed in between; with `active=true` that includes
+    runs that finished since the cursor. Ids owned by other users are omitted.
+    """
+    if ids is not None and len(ids) > MAX_BULK_STATUS_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {MAX_BULK_STATUS_IDS} ids per request"
+        )
+    runs = get_run_statuses(current_user, run_ids=ids, active_only=active, since=since)
+    cursor = runs[-1].status_version if runs else (since or 0)
+    return {
+        "cursor": cursor,
+        "runs": [_status_payload(r) for r in runs],
+    }
+
+
 @app.get("/api/runs/{run_id}/status")
 def get_status(run_id: int, current_user: str = Depends(get_current_user)):
     run = get_run_by_id(run_id)
@@ -142,16 +341,25 @@ def get_status(run_id: int, current_user: str = Depends(get_current_user)):
     if run.user_id != current_user:
         raise HTTPException(status_code=403, detail="Forbidden for this user")
 
-    return {
-        "run_id": run.id,
-        "model_id": run.model_id,
-        "status": run.status,
-        "started_at": run.created_at.isoformat() if run.created_at else None,
-        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
-    }
+    return _status_payload(run)
+
+# Scenario result chunks returned per /results page (and the max a client may ask for)
+RESULT_CHUNKS_PER_PAGE = 20
+MAX_RESULT_CHUNKS_PER_PAGE = 200
+
 
 @app.get("/api/runs/{run_id}/results")
-def get_results(run_id: int, current_user: str = Depends(get_current_user)):
+def get_results(
+    run_id: int,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=RESULT_CHUNKS_PER_PAGE, ge=1, le=MAX_RESULT_CHUNKS_PER_PAGE),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Results of a run. Scenario runs stream rows in chunks, so their table is
+    paged by chunk: `offset`/`limit` count chunks, and `nextOffset` is set
+    while more chunks remain (null otherwise).
+    """
     run = get_run_by_id(run_id)
     if run is None:
         raise HTTPException(status_code=404, detail="Run not found")
@@ -161,7 +369,47 @@ def get_results(run_id: int, current_user: str = Depends(get_current_user)):
     rr = get_run_result(run_id)
     if rr is None:
         # Results not persisted yet; return empty shape the UI can handle
-        return {"summaryMetrics": {}, "table": []}
+        return {"summaryMetrics": {}, "table": [], "nextOffset": None}
 
     # JSON fields come back as dict/list already
-    return {"summaryMetrics": rr.summary_json, "table": rr.table_json}
+    table = list(rr.table_json) if offset == 0 else []
+    # Scenario runs stream their rows in chunks (possibly still running);
+    # one extra chunk is fetched only to tell whether another page exists
+    chunks = get_run_result_chunks(run_id, offset=offset, limit=limit + 1)
+    for chunk in chunks[:limit]:
+        table.extend(chunk.rows_json)
+    next_offset = offset + limit if len(chunks) > limit else None
+    return {"summaryMetrics": rr.summary_json, "table": table, "nextOffset": next_offset}
+
+
+@app.get("/api/runs/{run_id}/profile")
+def get_profile(
+    run_id: int,
+    format: str = "pstats",
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Profile captured for a run. `format=pstats` returns the raw cProfile dump
+    (snakeviz, gprof2dot, flameprof); `format=collapsed` returns folded
+    caller;callee edges for flamegraph.pl / speedscope. cProfile keeps no
+    full stacks, so that view is two frames deep, not a full flame graph.
+    """
+    run = get_run_by_id(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.user_id != current_user:
+        raise HTTPException(status_code=403, detail="Forbidden for this user")
+
+    path = profile_path(run)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="No profile captured for this run")
+
+    if format == "pstats":
+        return FileResponse(
+            path,
+            media_type="application/octet-stream",
+            filename=f"run_{run_id}.prof",
+        )
+    if format == "collapsed":
+        return PlainTextResponse(collapsed_stacks(path))
+    raise HTTPException(status_code=400, detail="format must be 'pstats' or 'collapsed'")
@@ -1,11 +1,13 @@
-from .db_models import ModelInfo, Run, RunResult
+from .db_models import ModelInfo, Run, RunResult, RunResultChunk
 from .schemas import (
     RunRequest, RunCreatedResponse, RunStatusResponse,
-    RunResultsResponse, ModelListItem,
+    RunResultsResponse, ModelListItem, ScenarioRequest,
+    CompositeStep, CompositeRunRequest,
 )
 
 __all__ = [
-    "ModelInfo", "Run", "RunResult",
+    "ModelInfo", "Run", "RunResult", "RunResultChunk",
     "RunRequest", "RunCreatedResponse", "RunStatusResponse",
-    "RunResultsResponse", "ModelListItem",
+    "RunResultsResponse", "ModelListItem", "ScenarioRequest",
+    "CompositeStep", "CompositeRunRequest",
 ]
\ No newline at end of file
@@ -20,6 +20,8 @@ class ModelInfo(SQLModel, table=True):
 
 class Run(SQLModel, table=True):
     __tablename__: ClassVar[str] = "runs"  # <<— IMPORTANT: must be "runs"
+    # bulk status polling filters on user_id and status_version together
+    __table_args__ = (sa.Index("ix_runs_user_status_version", "user_id", "status_version"),)
     model_config: ClassVar[ConfigDict] = ConfigDict(protected_namespaces=())
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -29,12 +31,18 @@ class Run(SQLModel, table=True):
 
     user_id: str = Field(index=True)
     status: str = Field(index=True)  # "queued" | "preprocessing" | ...
+    # bumped from a global counter on every status change; cursor for bulk polling
+    status_version: int = Field(default=0, index=True)
 
     params_json: Dict[str, Any] = Field(
         default_factory=dict,
         sa_column=Column(sa.JSON, nullable=False),
     )
 
+    # "<hostname>:<pid>" of the API process that queued the run; runs whose
+    # process is gone are failed at startup (see db.fail_orphaned_runs)
+    worker_id: Optional[str] = None
+
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     finished_at: Optional[datetime] = None
 
@@ -54,3 +62,17 @@ class RunResult(SQLModel, table=True):
         default_factory=list,
         sa_column=Column(sa.JSON, nullable=False),
     )
+
+
+class RunResultChunk(SQLModel, table=True):
+    __tablename__: ClassVar[str] = "run_result_chunks"
+    model_config: ClassVar[ConfigDict] = ConfigDict(protected_namespaces=())
+
+    # Partial table rows streamed in by scenario runs, one row per finished chunk
+    run_id: int = Field(primary_key=True, foreign_key="runs.id")
+    chunk_index: int = Field(primary_key=True)
+
+    rows_json: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        sa_column=Column(sa.JSON, nullable=False),
+    )
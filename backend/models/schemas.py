@@ -11,6 +11,24 @@ class RunRequest(SQLModel):
     region: str
     year: int
 
+class ScenarioRequest(SQLModel):
+    model_config: ClassVar[ConfigDict] = ConfigDict(protected_namespaces=())
+    model_id: str
+    # Parameter name -> values to sweep, e.g. {"region": [...], "year": [...], "acreage_multiplier": [...]}
+    grid: Dict[str, List[Any]]
+    chunk_size: Optional[int] = None
+
+class CompositeStep(SQLModel):
+    model_config: ClassVar[ConfigDict] = ConfigDict(protected_namespaces=())
+    step_id: str
+    model_id: str
+    depends_on: List[str] = Field(default_factory=list)
+
+class CompositeRunRequest(SQLModel):
+    region: str
+    year: int
+    steps: List[CompositeStep]
+
 # Responses
 class RunCreatedResponse(SQLModel):
     run_id: int
@@ -0,0 +1,118 @@
+import cProfile
+import os
+import pstats
+import random
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+if TYPE_CHECKING:
+    from .models.db_models import Run
+
+PROFILE_DIR = Path(__file__).parent / "data" / "profiles"
+
+# Fraction of runs profiled even when not requested, e.g. 0.01 = 1% (override via env var)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.0"))
+
+# Most recent profiles kept on disk; older ones are deleted on save
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "200"))
+
+_NO_PROFILE = nullcontext()
+
+
+def should_profile(requested: bool = False) -> bool:
+    if requested:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_profile(enabled: bool) -> Optional[cProfile.Profile]:
+    return cProfile.Profile() if enabled else None
+
+
+@contextmanager
+def _profiled_section(profile: cProfile.Profile):
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ profiles through the process-wide sys.monitoring, so
+        # only one profiler can be active at a time; skip this section rather
+        # than fail the run when another run's section is being profiled.
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+
+
+def section(profile: Optional[cProfile.Profile]):
+    """
+    Context manager around a synchronous block of a run. Only these blocks are
+    profiled, so other coroutines sharing the event loop don't leak into the
+    trace; when profiling is off it is a shared no-op nullcontext.
+
+    On Python 3.12+ an enabled profiler also records other threads (e.g. the
+    event loop while a section runs in to_thread), and a section that starts
+    while another profiled section is active is not recorded.
+    """
+    return _profiled_section(profile) if profile is not None else _NO_PROFILE
+
+
+def profile_path(run: "Run") -> Path:
+    """
+    Trace file for a run. created_at is part of the name, so a run id reused
+    by a fresh or swapped database never serves an older run's trace.
+    """
+    return PROFILE_DIR / f"run_{run.id}_{run.created_at:%Y%m%dT%H%M%S%f}.prof"
+
+
+def save_profile(run: "Run", profile: cProfile.Profile) -> Path:
+    path = profile_path(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    profile.dump_stats(str(tmp_path))
+    os.replace(tmp_path, path)
+    _prune_profiles(path.parent)
+    return path
+
+
+def _prune_profiles(profile_dir: Path):
+    profiles = sorted(profile_dir.glob("run_*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[PROFILE_RETENTION:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+def _frame_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({Path(filename).name}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(path: Union[str, Path]) -> str:
+    """
+    Convert a pstats dump into folded stacks ("a;b <microseconds>") that
+    flamegraph.pl and speedscope read. cProfile records caller/callee pairs,
+    not full stacks, so every line is one real caller->callee edge weighted by
+    the callee's own time when called from that caller; functions without a
+    caller appear as single-frame roots. Deeper call paths are not
+    reconstructed, so the graph is at most two frames tall.
+    """
+    entries = pstats.Stats(str(path)).stats
+    folded = Counter()
+    for func, (_cc, _nc, tt, _ct, callers) in entries.items():
+        if not callers:
+            weight = int(tt * 1_000_000)
+            if weight > 0:
+                folded[_frame_label(func)] += weight
+            continue
+        for caller, (_enc, _ecc, edge_tt, _ect) in callers.items():
+            weight = int(edge_tt * 1_000_000)
+            if weight > 0:
+                folded[f"{_frame_label(caller)};{_frame_label(func)}"] += weight
+    return "".join(f"{stack} {weight}\n" for stack, weight in sorted(folded.items()))
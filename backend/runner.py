@@ -1,23 +1,50 @@
-import asyncio, csv, random, json, os
+import asyncio, random, json, os, itertools, math, multiprocessing, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
-from .db import update_run_status, save_run_result
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional, Tuple
+from .db import update_run_status, save_run_result, save_run_result_chunk, get_run_by_id
+from .profiling import start_profile, section, save_profile
+from . import datasets
+from .datasets import YIELD_CSV_PATH, WATER_CSV_PATH
 
-YIELD_CSV_PATH = Path(__file__).parent / "data" / "yield_data.csv"
-WATER_CSV_PATH = Path(__file__).parent / "data" / "water_risk_data.csv"
+if TYPE_CHECKING:
+    import numpy as np
 
 # Seconds to pause after each status change (override via env var)
 STEP_DELAY = float(os.getenv("RUNNER_STEP_DELAY", "3.0"))
 
-def _lookup_yield(region: str, year: int) -> Tuple[float, float, int]:
+# Scenario sweeps: grid points per chunk and process-pool size (override via env vars)
+SCENARIO_CHUNK_SIZE = int(os.getenv("SCENARIO_CHUNK_SIZE", "500"))
+# Largest chunk_size a request may ask for; bounds the memory held per chunk
+SCENARIO_CHUNK_SIZE_MAX = int(os.getenv("SCENARIO_CHUNK_SIZE_MAX", "5000"))
+SCENARIO_WORKERS = int(os.getenv("SCENARIO_WORKERS", str(os.cpu_count() or 1)))
+# Minimum seconds between progress-summary writes during a sweep
+SCENARIO_PROGRESS_INTERVAL = float(os.getenv("SCENARIO_PROGRESS_INTERVAL", "1.0"))
+
+def _records(rows: "np.ndarray") -> List[Dict[str, Any]]:
+    return [dict(zip(rows.dtype.names, rec)) for rec in rows.tolist()]
+
+def _scan_rows(csv_path: Path, region: str, year: int) -> List[Dict[str, Any]]:
+    """
+    Rows for region & year, from the shared memory-mapped copy of the dataset.
+    Blocking (may bootstrap a cold cache): call it off the event loop.
+    """
+    arr = datasets.attach(csv_path)
+    return _records(datasets.select_rows(arr, region, year))
+
+def _lookup_yield(
+    region: str,
+    year: int,
+    rows: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[float, float, int]:
+    if rows is None:
+        rows = _scan_rows(YIELD_CSV_PATH, region, year)
     matches = []
-    with open(YIELD_CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["region"] == region and int(row["year"]) == year:
-                acres = float(row["acres"])
-                yld = float(row["expected_yield_bu_acre"])
-                matches.append((acres, yld))
+    for row in rows:
+        acres = float(row["acres"])
+        yld = float(row["expected_yield_bu_acre"])
+        matches.append((acres, yld))
     if not matches:
         return (0.0, 0.0, 0)
     total_acres = sum(a for a, _ in matches)
@@ -25,23 +52,25 @@ def _lookup_yield(region: str, year: int) -> Tuple[float, float, int]:
     total_bu = sum(a * y for a, y in matches)
     return (avg_yield, total_bu, int(total_acres))
 
-def _compute_water_risk(region: str, year: int) -> Tuple[float, float, float, int]:
+def _compute_water_risk(
+    region: str,
+    year: int,
+    rows: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[float, float, float, int]:
     """
-    Reads backend/data/water_risk_data.csv
-    Filters by region & year
+    Reads the water risk dataset's rows for region & year from the shared
+    memory-mapped cache (unless pre-scanned rows are given)
     Returns (avg_drought_index, avg_irrigation_cost, avg_risk_score, num_records)
     """
     
+    if rows is None:
+        rows = _scan_rows(WATER_CSV_PATH, region, year)
     matches = []
-    with open(WATER_CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # match region & year
-            if row.get("region") == region and int(row.get("year", 0)) == year:
-                drought = float(row.get("drought_index", 0))
-                irrigation_cost = float(row.get("irrigation_cost_usd_per_acre", 0))
-                risk_score = 0.5 * drought + 0.5 * (irrigation_cost / 100.0)
-                matches.append((drought, irrigation_cost, risk_score))
+    for row in rows:
+        drought = float(row.get("drought_index", 0))
+        irrigation_cost = float(row.get("irrigation_cost_usd_per_acre", 0))
+        risk_score = 0.5 * drought + 0.5 * (irrigation_cost / 100.0)
+        matches.append((drought, irrigation_cost, risk_score))
     if not matches:
         # if nothing found, return zeros
         return (0.0, 0.0, 0.0, 0)
@@ -58,18 +87,18 @@ def _compute_water_risk(region: str, year: int) -> Tuple[float, float, float, in
 
 
 
-async def execute_model_async(run_id: int, model_id: str, params: Dict[str, Any]):
-    update_run_status(run_id, "running")
-    await asyncio.sleep(STEP_DELAY)
-
-    # show "computing" while doing the work
-    update_run_status(run_id, "computing")
-    await asyncio.sleep(STEP_DELAY)
-    
-    region = params.get("region")
-    year = int(params.get("year", 0))
+def _compute_model(
+    model_id: str,
+    region: str,
+    year: int,
+    rows: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Run one model for a region/year; returns (summary, table_rows).
+    `rows` are pre-scanned dataset rows (see MODEL_DATASETS); scanned here if omitted.
+    """
     if model_id == "crop_yield_predictor":
-        avg_yield, total_bu, total_acres = _lookup_yield(region, year)
+        avg_yield, total_bu, total_acres = _lookup_yield(region, year, rows)
         summary = {
             "expected_yield_bu_acre": round(avg_yield, 2),
             "total_production_bu": round(total_bu, 2),
@@ -87,7 +116,7 @@ async def execute_model_async(run_id: int, model_id: str, params: Dict[str, Any]
             }
         ]
     elif model_id == "water_risk":
-        avg_drought, avg_irrigation_cost, avg_risk, count = _compute_water_risk(region, year)
+        avg_drought, avg_irrigation_cost, avg_risk, count = _compute_water_risk(region, year, rows)
         summary = {
             "region": region,
             "year": year,
@@ -109,11 +138,381 @@ async def execute_model_async(run_id: int, model_id: str, params: Dict[str, Any]
     else:
         summary = {"error": "unknown model"}
         table_rows = []
+    return summary, table_rows
+
+
+def _profiled(prof, fn, *args):
+    """Call fn(*args) inside a profiling section; used to profile work run in a thread."""
+    with section(prof):
+        return fn(*args)
+
+
+async def execute_model_async(
+    run_id: int,
+    model_id: str,
+    params: Dict[str, Any],
+    profile: bool = False,
+):
+    # profiling is opt-in; with profile=False every section() is a no-op
+    prof = start_profile(profile)
+
+    try:
+        with section(prof):
+            update_run_status(run_id, "running")
+        await asyncio.sleep(STEP_DELAY)
+
+        # show "computing" while doing the work
+        with section(prof):
+            update_run_status(run_id, "computing")
+        await asyncio.sleep(STEP_DELAY)
+
+        region = params.get("region")
+        year = int(params.get("year", 0))
+        summary, table_rows = await asyncio.to_thread(
+            _profiled, prof, _compute_model, model_id, region, year
+        )
+
+        # show "postprocessing" before saving
+        with section(prof):
+            update_run_status(run_id, "postprocessing")
+        await asyncio.sleep(STEP_DELAY)
+
+        # save and finish
+        with section(prof):
+            save_run_result(run_id, summary, table_rows)
+            update_run_status(run_id, "succeeded")
+    except Exception as e:
+        # a failed run must reach a terminal status, or it counts against the active-run cap forever
+        save_run_result(run_id, {"error": str(e) or type(e).__name__}, [])
+        update_run_status(run_id, "failed")
+    finally:
+        if prof is not None:
+            save_profile(get_run_by_id(run_id), prof)
+
+
+# ---------------------------------------------------------------------------
+# Composite (DAG) runs
+# ---------------------------------------------------------------------------
+
+# Dataset each registered model reads; composite steps on the same dataset share one scan
+MODEL_DATASETS = {
+    "crop_yield_predictor": YIELD_CSV_PATH,
+    "water_risk": WATER_CSV_PATH,
+}
+
+JOIN_KEYS = ("region", "year")
+
+# Run.model_id stored for composite runs. Deliberately not seeded in `models`,
+# so the dashboard's model picker never offers it; /api/runs rejects it.
+COMPOSITE_MODEL_ID = "composite"
+
+
+def _water_risk_from_yield(
+    summary: Dict[str, Any],
+    table_rows: List[Dict[str, Any]],
+    upstream_summary: Dict[str, Any],
+):
+    """Total irrigation cost: the per-acre cost times the upstream yield step's acres."""
+    acres = upstream_summary.get("total_acres", 0)
+    derived = {
+        "irrigation_cost_total_usd": round(summary.get("avg_irrigation_cost_usd_per_acre", 0.0) * acres, 2),
+    }
+    summary.update(derived)
+    for row in table_rows:
+        row.update(derived)
+
+
+# dependent model_id -> {upstream model_id: combiner(summary, table_rows, upstream_summary)}.
+# A depends_on edge is only valid if the dependent model knows how to consume it.
+STEP_INPUTS = {
+    "water_risk": {"crop_yield_predictor": _water_risk_from_yield},
+}
+
+
+def plan_composite_waves(steps: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Validate a composite step list and group it into waves: every step in a
+    wave depends only on earlier waves, so a wave's steps can run concurrently.
+    Raises ValueError for unknown models/dependencies, duplicate ids or cycles.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for step in steps:
+        if step["step_id"] in by_id:
+            raise ValueError(f"Duplicate step_id '{step['step_id']}'")
+        if step["model_id"] not in MODEL_DATASETS:
+            raise ValueError(f"Unknown model '{step['model_id']}' in step '{step['step_id']}'")
+        by_id[step["step_id"]] = step
+    for step in steps:
+        for dep in step.get("depends_on", []):
+            if dep not in by_id:
+                raise ValueError(f"Step '{step['step_id']}' depends on unknown step '{dep}'")
+
+    waves = []
+    done: set = set()
+    remaining = list(steps)
+    while remaining:
+        wave = [s for s in remaining if set(s.get("depends_on", [])) <= done]
+        if not wave:
+            raise ValueError("Composite steps contain a dependency cycle")
+        waves.append(wave)
+        done.update(s["step_id"] for s in wave)
+        remaining = [s for s in remaining if s["step_id"] not in done]
+
+    for step in steps:
+        for dep in step.get("depends_on", []):
+            upstream_model = by_id[dep]["model_id"]
+            if upstream_model not in STEP_INPUTS.get(step["model_id"], {}):
+                raise ValueError(
+                    f"Step '{step['step_id']}' ({step['model_id']}) cannot consume "
+                    f"the output of step '{dep}' ({upstream_model})"
+                )
+    return waves
+
+
+def _run_step(
+    step: Dict[str, Any],
+    region: str,
+    year: int,
+    rows: List[Dict[str, Any]],
+    outputs: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+    step_models: Dict[str, str],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Compute one step, then fold in the in-memory outputs of its depends_on steps."""
+    summary, table_rows = _compute_model(step["model_id"], region, year, rows)
+    for dep in step.get("depends_on", []):
+        combine = STEP_INPUTS[step["model_id"]][step_models[dep]]
+        combine(summary, table_rows, outputs[dep][0])
+    return summary, table_rows
+
+
+def _join_outputs(
+    steps: List[Dict[str, Any]],
+    region: str,
+    year: int,
+    outputs: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Join step tables on (region, year). A column already set by an earlier
+    step is prefixed with the step id, e.g. "yield_b.total_bu".
+    """
+    summary = {
+        "region": region,
+        "year": year,
+        "steps": {s["step_id"]: outputs[s["step_id"]][0] for s in steps},
+    }
+    joined: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for step in steps:
+        for row in outputs[step["step_id"]][1]:
+            key = tuple(row.get(k) for k in JOIN_KEYS)
+            merged = joined.setdefault(key, dict(zip(JOIN_KEYS, key)))
+            for col, val in row.items():
+                if col in JOIN_KEYS:
+                    continue
+                merged[f"{step['step_id']}.{col}" if col in merged else col] = val
+    return summary, list(joined.values())
+
+
+async def execute_composite_async(run_id: int, params: Dict[str, Any]):
+    """
+    Run a DAG of registered models for one region/year. Each dataset is scanned
+    once and the matching rows are handed to every step that reads it. Steps
+    in the same wave run concurrently in threads; a dependent step receives
+    its upstream steps' outputs from memory (see STEP_INPUTS), and the joined
+    result is saved as one RunResult.
+    """
+    update_run_status(run_id, "running")
+    await asyncio.sleep(STEP_DELAY)
+
+    update_run_status(run_id, "computing")
+    await asyncio.sleep(STEP_DELAY)
+
+    steps = params["steps"]
+    region = params.get("region")
+    year = int(params.get("year", 0))
+    try:
+        waves = plan_composite_waves(steps)
+
+        paths = list({MODEL_DATASETS[s["model_id"]] for s in steps})
+        scans = await asyncio.gather(*(
+            asyncio.to_thread(_scan_rows, path, region, year) for path in paths
+        ))
+        inputs = dict(zip(paths, scans))
+
+        step_models = {s["step_id"]: s["model_id"] for s in steps}
+        outputs: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+        for wave in waves:
+            results = await asyncio.gather(*(
+                asyncio.to_thread(
+                    _run_step, s, region, year,
+                    inputs[MODEL_DATASETS[s["model_id"]]], outputs, step_models,
+                )
+                for s in wave
+            ))
+            for step, result in zip(wave, results):
+                outputs[step["step_id"]] = result
+
+        summary, table_rows = _join_outputs(steps, region, year, outputs)
+    except Exception as e:
+        save_run_result(run_id, {"error": str(e)}, [])
+        update_run_status(run_id, "failed")
+        return
 
-    # show "postprocessing" before saving
     update_run_status(run_id, "postprocessing")
     await asyncio.sleep(STEP_DELAY)
 
-    # save and finish
     save_run_result(run_id, summary, table_rows)
     update_run_status(run_id, "succeeded")
+
+
+# ---------------------------------------------------------------------------
+# Scenario sweeps
+# ---------------------------------------------------------------------------
+
+def _run_yield_scenario_chunk(npy_path: str, points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Worker entry point: evaluate one chunk of grid points for crop_yield_predictor
+    against one published dataset version (see datasets.py).
+    Supported point params: region, year, acreage_multiplier (default 1.0).
+    """
+    arr = datasets.open_version(npy_path)
+    rows = []
+    for point in points:
+        region = point.get("region")
+        year = int(point.get("year", 0))
+        multiplier = float(point.get("acreage_multiplier", 1.0))
+        avg_yield, total_bu, total_acres = _lookup_yield(
+            region, year, _records(datasets.select_rows(arr, region, year))
+        )
+        rows.append({
+            **point,
+            "avg_yield_bu_acre": round(avg_yield, 2),
+            "total_acres": int(total_acres * multiplier),
+            "total_bu": round(total_bu * multiplier, 2),
+        })
+    return rows
+
+
+# model_id -> (dataset, chunk worker)
+SCENARIO_MODELS = {
+    "crop_yield_predictor": (YIELD_CSV_PATH, _run_yield_scenario_chunk),
+}
+
+
+# One process pool per API process, shared by every sweep. Workers are spawned
+# fresh rather than forked from a process already running asyncio and threads.
+_SCENARIO_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _scenario_pool() -> ProcessPoolExecutor:
+    global _SCENARIO_POOL
+    if _SCENARIO_POOL is None:
+        _SCENARIO_POOL = ProcessPoolExecutor(
+            max_workers=SCENARIO_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _SCENARIO_POOL
+
+
+def _discard_scenario_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool (a worker died) so the next sweep builds a new one."""
+    global _SCENARIO_POOL
+    if _SCENARIO_POOL is pool:
+        _SCENARIO_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_scenario_pool():
+    """Called at app shutdown; never blocks on chunks still running."""
+    global _SCENARIO_POOL
+    if _SCENARIO_POOL is not None:
+        _SCENARIO_POOL.shutdown(wait=False, cancel_futures=True)
+        _SCENARIO_POOL = None
+
+
+def _iter_grid_chunks(grid: Dict[str, List[Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Lazily expand the cartesian product of the grid, chunk_size points at a time."""
+    keys = list(grid)
+    points = (
+        dict(zip(keys, values))
+        for values in itertools.product(*(grid[k] for k in keys))
+    )
+    while True:
+        chunk = list(itertools.islice(points, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def execute_scenario_async(
+    run_id: int,
+    model_id: str,
+    grid: Dict[str, List[Any]],
+    chunk_size: Optional[int] = None,
+):
+    """
+    Fan a parameter grid out over a process pool. At most 2 chunks per worker
+    are in flight, so memory stays bounded by the chunk size rather than the
+    grid size; each finished chunk is written straight to run_result_chunks.
+    """
+    update_run_status(run_id, "running")
+
+    dataset, run_chunk = SCENARIO_MODELS[model_id]
+    chunk_size = chunk_size or SCENARIO_CHUNK_SIZE
+    summary = {
+        "model_id": model_id,
+        "grid_points": math.prod(len(v) for v in grid.values()),
+        "chunk_size": chunk_size,
+        "points_done": 0,
+        "chunks_done": 0,
+    }
+
+    loop = asyncio.get_running_loop()
+    pending: Dict[asyncio.Future, int] = {}
+    pool = None
+    pin_path = None
+    try:
+        # pin one dataset version for the whole sweep, even if it is swapped mid-run;
+        # the pin keeps publish() from pruning it before the workers open it
+        npy_path, pin_path = await loop.run_in_executor(None, datasets.pin_current, dataset)
+        npy_path = str(npy_path)
+        update_run_status(run_id, "computing")
+
+        pool = _scenario_pool()
+        max_in_flight = SCENARIO_WORKERS * 2
+        chunks = enumerate(_iter_grid_chunks(grid, chunk_size))
+        last_progress = time.monotonic()
+        while True:
+            for chunk_index, points in itertools.islice(chunks, max_in_flight - len(pending)):
+                fut = loop.run_in_executor(pool, run_chunk, npy_path, points)
+                pending[fut] = chunk_index
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                chunk_index = pending.pop(fut)
+                rows = fut.result()
+                save_run_result_chunk(run_id, chunk_index, rows)
+                summary["points_done"] += len(rows)
+                summary["chunks_done"] += 1
+            # progress is visible through /results while the sweep runs
+            if time.monotonic() - last_progress >= SCENARIO_PROGRESS_INTERVAL:
+                save_run_result(run_id, summary, [])
+                last_progress = time.monotonic()
+    except (Exception, asyncio.CancelledError) as e:
+        # drop queued chunks instead of waiting for them; the shared pool stays up
+        for fut in pending:
+            fut.cancel()
+        if isinstance(e, BrokenProcessPool) and pool is not None:
+            _discard_scenario_pool(pool)
+        save_run_result(run_id, {**summary, "error": str(e) or type(e).__name__}, [])
+        update_run_status(run_id, "failed")
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        return
+    finally:
+        if pin_path is not None:
+            datasets.unpin(pin_path)
+
+    update_run_status(run_id, "postprocessing")
+    save_run_result(run_id, summary, [])
+    update_run_status(run_id, "succeeded")
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from . import db
+
+
+@dataclass(frozen=True)
+class RunLimits:
+    """Admission limits. A rate or active-run cap of 0 disables that limit."""
+    user_rate_per_min: float = 30.0
+    user_burst: int = 10
+    global_rate_per_min: float = 300.0
+    global_burst: int = 50
+    max_active_per_user: int = 5
+
+
+def _default_limits() -> RunLimits:
+    return RunLimits(
+        user_rate_per_min=float(os.getenv("RATE_LIMIT_USER_PER_MIN", "30")),
+        user_burst=int(os.getenv("RATE_LIMIT_USER_BURST", "10")),
+        global_rate_per_min=float(os.getenv("RATE_LIMIT_GLOBAL_PER_MIN", "300")),
+        global_burst=int(os.getenv("RATE_LIMIT_GLOBAL_BURST", "50")),
+        max_active_per_user=int(os.getenv("MAX_ACTIVE_RUNS_PER_USER", "5")),
+    )
+
+
+def model_override(defaults: RunLimits, **overrides) -> RunLimits:
+    """
+    Extra limits for one model, applied on top of the defaults. Only the
+    given rates/caps apply; bursts fall back to the defaults.
+    """
+    base = RunLimits(
+        user_rate_per_min=0,
+        user_burst=defaults.user_burst,
+        global_rate_per_min=0,
+        global_burst=defaults.global_burst,
+        max_active_per_user=0,
+    )
+    return replace(base, **overrides)
+
+
+def _model_limits(defaults: RunLimits) -> Dict[str, RunLimits]:
+    """
+    Per-model overrides from RUN_LIMITS_JSON, e.g.
+    {"water_risk": {"user_rate_per_min": 10, "max_active_per_user": 2}}
+    """
+    raw = json.loads(os.getenv("RUN_LIMITS_JSON", "{}"))
+    return {model_id: model_override(defaults, **overrides) for model_id, overrides in raw.items()}
+
+
+# Runs executing at once per process; further runs wait in the fair-share queue
+MAX_CONCURRENT_RUNS = int(os.getenv("RUNNER_MAX_CONCURRENT_RUNS", "8"))
+# Queued runs per process before new submissions are shed with 503
+MAX_QUEUED_RUNS = int(os.getenv("RUNNER_MAX_QUEUED_RUNS", "200"))
+# Retry-After (seconds) when rejecting because of queue depth / active-run cap
+BUSY_RETRY_AFTER = int(os.getenv("RUNNER_BUSY_RETRY_AFTER", "5"))
+# Seconds between sweeps that drop idle (full) token buckets
+BUCKET_SWEEP_INTERVAL = 60.0
+
+
+class TokenBucket:
+    def __init__(self, rate_per_min: float, burst: int, now: float):
+        self.rate = rate_per_min / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0.0 if available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        """Idle long enough to refill; dropping it loses nothing (a new bucket starts full)."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def take(self):
+        self.tokens -= 1.0
+
+
+def _throttled(status_code: int, detail: str, retry_after: float):
+    return HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RunScheduler:
+    """
+    Admission control and fair-share dispatch for run executions.
+
+    admit() enforces a per-user and a process-wide token bucket and a cap on
+    the user's active (queued + running) runs across all models; a model
+    listed in model_limits additionally gets its own buckets and cap on top.
+    It also sheds load when the queue is full. submit() queues a job per
+    user; whenever a slot frees up, the pending user served least recently
+    goes next, so one user's backlog cannot starve others.
+
+    Buckets and the queue are per process; active-run counts come from the
+    runs table (active_runs), so the cap holds across workers.
+    """
+
+    def __init__(
+        self,
+        default_limits: Optional[RunLimits] = None,
+        model_limits: Optional[Dict[str, RunLimits]] = None,
+        max_concurrent: int = MAX_CONCURRENT_RUNS,
+        max_queued: int = MAX_QUEUED_RUNS,
+        clock: Callable[[], float] = time.monotonic,
+        active_runs: Optional[Callable[[str, Optional[str]], int]] = None,
+    ):
+        self.default_limits = default_limits or _default_limits()
+        self.model_limits = (
+            model_limits if model_limits is not None else _model_limits(self.default_limits)
+        )
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.clock = clock
+        # resolved on each call so tests can swap db.engine
+        self.active_runs = active_runs or (lambda user_id, model_id: db.count_active_runs(user_id, model_id))
+        self.reset()
+
+    def reset(self):
+        self._buckets: Dict[Tuple[str, ...], TokenBucket] = {}
+        self._next_sweep = 0.0
+        self._pending: Dict[str, Deque[Callable[[], Awaitable[Any]]]] = {}
+        self._last_served: Dict[str, int] = {}
+        self._running_by_user: Counter = Counter()
+        self._ticks = 0
+        self._running = 0
+        self._tasks: set = set()  # strong refs so running tasks aren't garbage-collected
+
+    def _scopes(self, model_id: str) -> List[Tuple[Optional[str], RunLimits]]:
+        """(model scope, limits) pairs to enforce: defaults, then any override."""
+        scopes: List[Tuple[Optional[str], RunLimits]] = [(None, self.default_limits)]
+        if model_id in self.model_limits:
+            scopes.append((model_id, self.model_limits[model_id]))
+        return scopes
+
+    @property
+    def queued(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    def _evict_idle_buckets(self, now: float):
+        # user ids come from a header, so buckets must not accumulate per id ever seen
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + BUCKET_SWEEP_INTERVAL
+        for key in [k for k, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[key]
+
+    def _bucket(self, key: Tuple[str, ...], rate_per_min: float, burst: int, now: float):
+        if rate_per_min <= 0:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate_per_min, burst, now)
+        return bucket
+
+    def admit(self, user_id: str, model_id: str):
+        """Raise 429/503 with Retry-After if this submission must be rejected."""
+        scopes = self._scopes(model_id)
+
+        if self.queued >= self.max_queued:
+            raise _throttled(503, "Run queue is full, try again later", BUSY_RETRY_AFTER)
+
+        for scope, limits in scopes:
+            if limits.max_active_per_user <= 0:
+                continue
+            if self.active_runs(user_id, scope) >= limits.max_active_per_user:
+                what = f"for model '{scope}'" if scope else "for this user"
+                raise _throttled(
+                    429,
+                    f"Too many active runs {what} (limit {limits.max_active_per_user})",
+                    BUSY_RETRY_AFTER,
+                )
+
+        now = self.clock()
+        self._evict_idle_buckets(now)
+        buckets = []
+        for scope, limits in scopes:
+            key = (scope,) if scope else ()
+            buckets += [
+                ("user", scope, self._bucket(("user", *key, user_id), limits.user_rate_per_min, limits.user_burst, now)),
+                ("global", scope, self._bucket(("global", *key), limits.global_rate_per_min, limits.global_burst, now)),
+            ]
+        # check every bucket before taking from any, so a rejection costs nothing
+        for kind, scope, bucket in buckets:
+            if bucket is None:
+                continue
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                what = f" for model '{scope}'" if scope else ""
+                raise _throttled(429, f"Rate limit exceeded ({kind}){what}", wait)
+        for _, _, bucket in buckets:
+            if bucket is not None:
+                bucket.take()
+
+    def submit(self, user_id: str, job: Callable[[], Awaitable[Any]]):
+        """Queue job() for user_id; it is started on the running event loop."""
+        self._pending.setdefault(user_id, deque()).append(partial(self._run, user_id, job))
+        self._pump()
+
+    async def _run(self, user_id: str, job: Callable[[], Awaitable[Any]]):
+        try:
+            await job()
+        finally:
+            self._running -= 1
+            self._running_by_user[user_id] -= 1
+            if self._running_by_user[user_id] <= 0:
+                del self._running_by_user[user_id]
+                # nothing queued or running: forget the user rather than keep an entry per id ever seen
+                if user_id not in self._pending:
+                    del self._last_served[user_id]
+            self._pump()
+
+    def _pump(self):
+        while self._running < self.max_concurrent and self._pending:
+            user_id = min(self._pending, key=lambda u: self._last_served.get(u, 0))
+            jobs = self._pending[user_id]
+            job = jobs.popleft()
+            if not jobs:
+                del self._pending[user_id]
+            self._ticks += 1
+            self._last_served[user_id] = self._ticks
+            self._running_by_user[user_id] += 1
+            self._running += 1
+            task = asyncio.get_running_loop().create_task(job())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+scheduler = RunScheduler()
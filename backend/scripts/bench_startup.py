@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports backend.main in fresh interpreters and reports import time, plus
+the time to run the lifespan startup (init_db) against a throwaway SQLite DB.
+
+Usage:
+    python backend/scripts/bench_startup.py [--runs 10] [--max-import-ms 1500]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Runs inside each fresh interpreter; prints one JSON line
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import backend.main as main
+t1 = time.perf_counter()
+heavy = sorted(m for m in ("pandas", "numpy") if m in sys.modules)
+
+import backend.db as db
+from sqlmodel import create_engine
+db.engine = create_engine(sys.argv[1])
+main.init_db()
+t2 = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "init_db_ms": (t2 - t1) * 1000,
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def run_once(db_url: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, db_url],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="exit non-zero if the median import time exceeds this")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            db_url = f"sqlite:///{Path(tmp, f'bench_{i}.db').as_posix()}"
+            results.append(run_once(db_url))
+
+    import_ms = [r["import_ms"] for r in results]
+    init_ms = [r["init_db_ms"] for r in results]
+    heavy = sorted({m for r in results for m in r["heavy_modules"]})
+
+    print(f"runs:              {args.runs}")
+    print(f"import backend.main  median {statistics.median(import_ms):8.1f} ms   max {max(import_ms):8.1f} ms")
+    print(f"lifespan init_db     median {statistics.median(init_ms):8.1f} ms   max {max(init_ms):8.1f} ms")
+    print(f"heavy modules at import: {heavy or 'none'}")
+
+    failed = bool(heavy)
+    if args.max_import_ms is not None and statistics.median(import_ms) > args.max_import_ms:
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
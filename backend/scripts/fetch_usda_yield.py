@@ -228,7 +228,10 @@ def main():
     out = out.sort_values(["region","year"]).reset_index(drop=True)
 
     out_path = OUT_DIR / "yield_data.csv"
-    out.to_csv(out_path, index=False)
+    # write-then-rename so the running app never reads a half-written CSV
+    tmp_path = out_path.with_suffix(".csv.tmp")
+    out.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
     print(f"✅ Wrote {len(out)} rows to {out_path}")
     print(out.head(12).to_string(index=False))
 
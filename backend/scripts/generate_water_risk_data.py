@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -31,5 +32,8 @@ df["risk_level"] = pd.cut(
 
 # Save new file
 data_dir.mkdir(exist_ok=True)
-df.to_csv(water_path, index=False)
+# write-then-rename so the running app never reads a half-written CSV
+tmp_path = water_path.with_suffix(".csv.tmp")
+df.to_csv(tmp_path, index=False)
+os.replace(tmp_path, water_path)
 print(f"Water risk dataset created: {water_path}")
@@ -0,0 +1,356 @@
+"""
+Load-test harness for the API.
+
+Starts the app locally with uvicorn, using RUNNER_STEP_DELAY=0, a synthetic
+large dataset and a throwaway SQLite DB. It then drives a realistic
+dashboard mix with an asyncio httpx client, in stages of increasing
+concurrent users. The mix is regions/models lookups, run submission,
+status polling until the run finishes, and a results fetch.
+
+For every stage it reports p50/p95/p99 latency, throughput and error rate
+per endpoint, plus succeeded runs per second and the number of failed runs. It flags the stage where
+SQLite write contention sets in: "database is locked" errors appear in the
+server log, or POST /api/runs p95 exceeds --knee-factor x the first stage's.
+
+Usage:
+    python backend/scripts/load_test.py --stages 5,10,20,40 --stage-seconds 20 --workers 2
+    python backend/scripts/load_test.py --url http://localhost:8000   # already running app
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[2]
+
+STATES = ["IA", "IL", "IN", "OH", "KS", "MI"]
+MODELS = ["crop_yield_predictor", "water_risk"]
+TERMINAL = {"succeeded", "failed"}
+LOCK_MARKER = "database is locked"
+
+
+# ---------------------------------------------------------------------------
+# Synthetic dataset + local app
+# ---------------------------------------------------------------------------
+
+def write_synthetic_datasets(data_dir: Path, regions: int, years: range, seed: int = 42) -> List[str]:
+    """Write yield_data.csv and water_risk_data.csv with regions x years rows."""
+    rnd = random.Random(seed)
+    names = [f"{STATES[i % len(STATES)]}-Zone{i:04d}" for i in range(regions)]
+    data_dir.mkdir(parents=True, exist_ok=True)
+    with open(data_dir / "yield_data.csv", "w", newline="") as fy, \
+            open(data_dir / "water_risk_data.csv", "w", newline="") as fw:
+        yw = csv.writer(fy)
+        ww = csv.writer(fw)
+        yw.writerow(["region", "year", "acres", "expected_yield_bu_acre"])
+        ww.writerow(["region", "year", "acres", "expected_yield_bu_acre",
+                     "rainfall_mm", "irrigation_cost_usd_per_acre", "drought_index"])
+        for name in names:
+            for year in years:
+                acres = round(rnd.uniform(2e5, 3e6), 1)
+                yld = round(rnd.gauss(165, 20), 1)
+                yw.writerow([name, year, acres, yld])
+                ww.writerow([name, year, acres, yld,
+                             round(rnd.gauss(850, 100), 1),
+                             round(rnd.gauss(25, 75), 1),
+                             round(rnd.gauss(0.1, 0.9), 3)])
+    return names
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(workdir: Path, workers: int, port: int, log_file: IO[str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "RUNNER_STEP_DELAY": "0",
+        "RUNNER_DATA_DIR": str(workdir),
+        "RUNNER_DB_URL": f"sqlite:///{(workdir / 'runs.db').as_posix()}",
+        # measure capacity, not the admission limits
+        "RATE_LIMIT_USER_PER_MIN": "0",
+        "RATE_LIMIT_GLOBAL_PER_MIN": "0",
+        "MAX_ACTIVE_RUNS_PER_USER": "1000000",
+        "RUNNER_MAX_QUEUED_RUNS": "1000000",
+        "RUNNER_MAX_CONCURRENT_RUNS": "1000000",
+    }
+    # create the fresh DB's tables and seed rows, and publish the large synthetic
+    # datasets, once up front rather than in every worker at startup
+    subprocess.run(
+        [sys.executable, "-c", "from backend.db import init_db; init_db()"],
+        cwd=ROOT, env=env, check=True,
+    )
+    subprocess.run(
+        [sys.executable, "-m", "backend.datasets"],
+        cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=log_file,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                r = await client.get("/api/models", headers={"x-user-id": "loadtest"})
+                if r.status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"App at {base_url} did not become ready within {timeout}s")
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+
+class StageStats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.runs_completed = 0  # succeeded
+        self.runs_failed = 0
+
+    def record(self, label: str, seconds: float, error: Optional[str] = None):
+        self.latencies[label].append(seconds)
+        if error is not None:
+            self.errors[label][error] += 1
+
+
+async def _call(client: httpx.AsyncClient, stats: StageStats, label: str, method: str, url: str, **kw):
+    t0 = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kw)
+    except httpx.HTTPError as e:
+        stats.record(label, time.perf_counter() - t0, type(e).__name__)
+        return None
+    stats.record(label, time.perf_counter() - t0, None if r.status_code < 400 else str(r.status_code))
+    return r
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    stats: StageStats,
+    user_id: str,
+    regions: List[str],
+    stop_at: float,
+    poll_interval: float,
+    think_time: float,
+):
+    """One dashboard session: browse, submit a run, poll it to completion, read results."""
+    headers = {"x-user-id": user_id}
+    while time.monotonic() < stop_at:
+        if random.random() < 0.3:
+            await _call(client, stats, "GET /api/models", "GET", "/api/models", headers=headers)
+        if random.random() < 0.3:
+            await _call(client, stats, "GET /api/regions", "GET", "/api/regions", headers=headers)
+
+        payload = {
+            "model_id": random.choice(MODELS),
+            "region": random.choice(regions),
+            "year": random.randint(2000, 2024),
+        }
+        r = await _call(client, stats, "POST /api/runs", "POST", "/api/runs", json=payload, headers=headers)
+        if r is not None and r.status_code == 200:
+            run_id = r.json()["run_id"]
+            while time.monotonic() < stop_at:
+                s = await _call(client, stats, "GET /api/runs/{id}/status", "GET",
+                                f"/api/runs/{run_id}/status", headers=headers)
+                if s is None or s.status_code != 200 or s.json()["status"] in TERMINAL:
+                    break
+                await asyncio.sleep(poll_interval)
+            else:
+                continue
+            if s is not None and s.status_code == 200:
+                if s.json()["status"] == "succeeded":
+                    stats.runs_completed += 1
+                else:
+                    stats.runs_failed += 1
+                await _call(client, stats, "GET /api/runs/{id}/results", "GET",
+                            f"/api/runs/{run_id}/results", headers=headers)
+
+        await asyncio.sleep(random.uniform(0, think_time))
+
+
+async def run_stage(base_url: str, users: int, seconds: float, regions: List[str], args) -> StageStats:
+    stats = StageStats()
+    stop_at = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await asyncio.gather(*(
+            virtual_user(client, stats, f"loadtest-{i}@corteva.internal", regions,
+                         stop_at, args.poll_interval, args.think_time)
+            for i in range(users)
+        ))
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(stats: StageStats, users: int, seconds: float, lock_errors: int) -> dict:
+    endpoints = {}
+    for label, values in sorted(stats.latencies.items()):
+        values = sorted(values)
+        errors = sum(stats.errors[label].values())
+        endpoints[label] = {
+            "requests": len(values),
+            "rps": len(values) / seconds,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "error_rate": errors / len(values),
+            "errors": dict(stats.errors[label]),
+        }
+    return {
+        "users": users,
+        "seconds": seconds,
+        "total_rps": sum(e["requests"] for e in endpoints.values()) / seconds,
+        "runs_completed": stats.runs_completed,
+        "runs_per_second": stats.runs_completed / seconds,
+        "runs_failed": stats.runs_failed,
+        "db_locked_errors": lock_errors,
+        "endpoints": endpoints,
+    }
+
+
+def print_stage(index: int, stage: dict):
+    print(f"\n=== stage {index}: {stage['users']} users, {stage['seconds']:.0f}s, "
+          f"{stage['total_rps']:.1f} req/s, {stage['runs_per_second']:.2f} runs/s, "
+          f"{stage['runs_failed']} failed runs, "
+          f"db-locked errors: {stage['db_locked_errors']}")
+    print(f"{'endpoint':32} {'reqs':>7} {'rps':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>6}")
+    for label, e in stage["endpoints"].items():
+        print(f"{label:32} {e['requests']:7d} {e['rps']:7.1f} {e['p50_ms']:8.1f} "
+              f"{e['p95_ms']:8.1f} {e['p99_ms']:8.1f} {e['error_rate'] * 100:6.2f}")
+
+
+def find_contention_knee(stages: List[dict], factor: float) -> Optional[dict]:
+    """First stage with lock errors, or whose run-submit p95 exceeds factor x the first stage's."""
+    write = "POST /api/runs"
+    baseline = stages[0]["endpoints"].get(write, {}).get("p95_ms") if stages else None
+    for i, stage in enumerate(stages):
+        p95 = stage["endpoints"].get(write, {}).get("p95_ms")
+        if stage["db_locked_errors"]:
+            return {"stage": i, "users": stage["users"], "reason": f"{stage['db_locked_errors']} '{LOCK_MARKER}' errors"}
+        if baseline and p95 and i > 0 and p95 > factor * baseline:
+            return {"stage": i, "users": stage["users"],
+                    "reason": f"{write} p95 {p95:.1f} ms > {factor:g} x baseline {baseline:.1f} ms "
+                              f"(write-latency knee, no lock errors yet)"}
+    return None
+
+
+def _count_lock_errors(log_path: Optional[Path], offset: int) -> Tuple[int, int]:
+    if log_path is None or not log_path.exists():
+        return 0, offset
+    with open(log_path, errors="replace") as f:
+        f.seek(offset)
+        text = f.read()
+        return text.count(LOCK_MARKER), f.tell()
+
+
+async def main_async(args) -> int:
+    stage_users = [int(u) for u in args.stages.split(",")]
+    proc = None
+    log_path = None
+    log_file = None
+    tmp = tempfile.TemporaryDirectory(prefix="runner-loadtest-")
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            workdir = Path(tmp.name)
+            print(f"Writing synthetic dataset: {args.regions} regions x 25 years -> {workdir}")
+            write_synthetic_datasets(workdir, args.regions, range(2000, 2025))
+            port = _free_port()
+            log_path = workdir / "server.log"
+            log_file = open(log_path, "w")
+            proc = start_app(workdir, args.workers, port, log_file)
+            base_url = f"http://127.0.0.1:{port}"
+        await wait_ready(base_url)
+
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+            r = await client.get("/api/regions", headers={"x-user-id": "loadtest"})
+            r.raise_for_status()
+            regions = r.json()["regions"]
+
+        stages = []
+        log_offset = 0
+        for users in stage_users:
+            stats = await run_stage(base_url, users, args.stage_seconds, regions, args)
+            lock_errors, log_offset = _count_lock_errors(log_path, log_offset)
+            stage = summarize(stats, users, args.stage_seconds, lock_errors)
+            print_stage(len(stages), stage)
+            stages.append(stage)
+
+        knee = find_contention_knee(stages, args.knee_factor)
+        print()
+        if knee:
+            print(f"SQLite contention sets in at stage {knee['stage']} ({knee['users']} users): {knee['reason']}")
+        else:
+            print("No SQLite contention detected up to the last stage")
+
+        if args.json:
+            Path(args.json).write_text(json.dumps({"stages": stages, "contention": knee}, indent=2))
+        return 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if log_file is not None:
+            log_file.close()
+        tmp.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target an already running app instead of starting one")
+    parser.add_argument("--stages", default="5,10,20,40,80", help="comma-separated concurrent users per stage")
+    parser.add_argument("--stage-seconds", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn worker processes")
+    parser.add_argument("--regions", type=int, default=2000, help="synthetic regions (x 25 years of rows)")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="seconds between status polls")
+    parser.add_argument("--think-time", type=float, default=1.0, help="max seconds between user actions")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--knee-factor", type=float, default=3.0)
+    parser.add_argument("--json", help="also write the report as JSON to this path")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,14 @@ from sqlmodel import SQLModel, create_engine
 from sqlalchemy.pool import StaticPool
 
 
-@pytest.fixture(name="client")
-def client_fixture(monkeypatch):
-    # Make repo root importable (…/model-runner/)
-    ROOT = pathlib.Path(__file__).resolve().parents[2]
-    if str(ROOT) not in sys.path:
-        sys.path.insert(0, str(ROOT))
+# Make repo root importable (…/model-runner/)
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
 
+@pytest.fixture(name="client")
+def client_fixture(monkeypatch, tmp_path):
     import backend.models.db_models  # Ensure tables registered
 
     test_engine = create_engine(
@@ -27,6 +28,12 @@ def client_fixture(monkeypatch):
     import backend.db as db
     monkeypatch.setattr(db, "engine", test_engine, raising=True)
 
+    import backend.datasets as datasets
+    monkeypatch.setattr(datasets, "CACHE_DIR", tmp_path / "cache", raising=True)
+
+    from backend.scheduler import scheduler
+    scheduler.reset()  # rate-limit buckets and queue are per process
+
     from backend.main import app, get_current_user
     app.dependency_overrides[get_current_user] = lambda: "scientist@corteva.internal"
 
@@ -0,0 +1,112 @@
+def test_bulk_status_since_cursor(client):
+    from backend.db import create_run, update_run_status
+
+    user = "scientist@corteva.internal"
+    params = {"region": "IA-Central", "year": 2010}
+    a = create_run("crop_yield_predictor", user, params)
+    b = create_run("water_risk", user, params)
+    other = create_run("water_risk", "someone@else.internal", params)
+    update_run_status(a, "succeeded")
+
+    r = client.get("/api/runs/status", params={"ids": [a, b, other]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [run["run_id"] for run in body["runs"]] == [b, a]
+    cursor = body["cursor"]
+
+    r = client.get("/api/runs/status", params={"active": True})
+    assert [run["run_id"] for run in r.json()["runs"]] == [b]
+
+    r = client.get("/api/runs/status", params={"since": cursor})
+    assert r.json() == {"cursor": cursor, "runs": []}
+
+    update_run_status(b, "computing")
+    r = client.get("/api/runs/status", params={"since": cursor})
+    [changed] = r.json()["runs"]
+    assert changed["run_id"] == b and changed["status"] == "computing"
+    assert r.json()["cursor"] > cursor
+
+
+def test_active_since_returns_runs_that_finished_after_cursor(client):
+    from backend.db import create_run, update_run_status
+
+    user = "scientist@corteva.internal"
+    params = {"region": "IA-Central", "year": 2010}
+    a = create_run("crop_yield_predictor", user, params)
+    b = create_run("water_risk", user, params)
+    cursor = client.get("/api/runs/status", params={"active": True}).json()["cursor"]
+
+    update_run_status(a, "succeeded")
+    r = client.get("/api/runs/status", params={"active": True, "since": cursor})
+    [finished] = r.json()["runs"]
+    assert finished["run_id"] == a and finished["status"] == "succeeded"
+
+    cursor = r.json()["cursor"]
+    update_run_status(b, "failed")
+    r = client.get("/api/runs/status", params={"active": True, "since": cursor})
+    assert [(run["run_id"], run["status"]) for run in r.json()["runs"]] == [(b, "failed")]
+
+
+def test_init_db_adds_status_version_to_old_runs_table(monkeypatch):
+    from sqlalchemy.pool import StaticPool
+    from sqlmodel import create_engine
+    import backend.db as db
+
+    old_engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE runs (id INTEGER PRIMARY KEY, model_id VARCHAR NOT NULL, "
+            "user_id VARCHAR NOT NULL, status VARCHAR NOT NULL, params_json JSON NOT NULL, "
+            "created_at DATETIME NOT NULL, finished_at DATETIME)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO runs VALUES (7, 'water_risk', 'u', 'succeeded', '{}', '2025-01-01', NULL)"
+        )
+    monkeypatch.setattr(db, "engine", old_engine)
+    db.init_db()
+
+    assert [r.status_version for r in db.get_run_statuses("u")] == [7]
+    with old_engine.connect() as conn:
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(runs)")}
+    assert {"ix_runs_status_version", "ix_runs_user_status_version"} <= indexes
+
+
+
+def test_migration_waits_for_another_worker_adding_the_column(tmp_path, monkeypatch):
+    import sqlite3
+    import threading
+    from sqlmodel import create_engine
+    import backend.db as db
+
+    db_path = tmp_path / "runs.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE runs (id INTEGER PRIMARY KEY, model_id VARCHAR NOT NULL, "
+            "user_id VARCHAR NOT NULL, status VARCHAR NOT NULL, params_json JSON NOT NULL, "
+            "created_at DATETIME NOT NULL, finished_at DATETIME)"
+        )
+    monkeypatch.setattr(db, "engine", create_engine(f"sqlite:///{db_path.as_posix()}"))
+
+    # another worker is mid-migration: it holds the write lock and adds the column
+    other = sqlite3.connect(db_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("ALTER TABLE runs ADD COLUMN status_version INTEGER NOT NULL DEFAULT 0")
+
+    errors = []
+    worker = threading.Thread(target=lambda: _capture(errors, db._migrate_runs_table))
+    worker.start()
+    worker.join(0.5)
+    assert worker.is_alive()  # waiting for the lock, not racing past the column check
+    other.execute("COMMIT")
+    other.close()
+    worker.join(10)
+    assert errors == []
+
+
+def _capture(errors, fn):
+    try:
+        fn()
+    except Exception as e:
+        errors.append(e)
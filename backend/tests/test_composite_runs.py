@@ -0,0 +1,79 @@
+import asyncio
+
+
+def test_composite_run_joins_steps_with_one_scan_per_dataset(client, monkeypatch):
+    import backend.runner as runner
+    from backend.db import create_run, get_run_by_id
+
+    monkeypatch.setattr(runner, "STEP_DELAY", 0)
+    scanned = []
+    real_scan = runner._scan_rows
+
+    def counting_scan(path, region, year):
+        scanned.append(path)
+        return real_scan(path, region, year)
+
+    monkeypatch.setattr(runner, "_scan_rows", counting_scan)
+
+    params = {
+        "region": "IA-Central",
+        "year": 2012,
+        "steps": [
+            {"step_id": "yield", "model_id": "crop_yield_predictor", "depends_on": []},
+            {"step_id": "water", "model_id": "water_risk", "depends_on": ["yield"]},
+            {"step_id": "yield_again", "model_id": "crop_yield_predictor", "depends_on": []},
+        ],
+    }
+    run_id = create_run("composite", "scientist@corteva.internal", params)
+    asyncio.run(runner.execute_composite_async(run_id, params))
+
+    assert get_run_by_id(run_id).status == "succeeded"
+    assert sorted(scanned) == sorted([runner.YIELD_CSV_PATH, runner.WATER_CSV_PATH])
+
+    body = client.get(f"/api/runs/{run_id}/results").json()
+    steps = body["summaryMetrics"]["steps"]
+    assert set(steps) == {"yield", "water", "yield_again"}
+    [row] = body["table"]
+    assert row["region"] == "IA-Central" and row["year"] == 2012
+    assert "avg_yield_bu_acre" in row and "water_risk_score" in row
+    assert row["yield_again.total_bu"] == row["total_bu"]
+
+    # the dependent water step consumed the yield step's in-memory output
+    yield_summary, water_summary = steps["yield"], steps["water"]
+    assert water_summary["irrigation_cost_total_usd"] == round(
+        water_summary["avg_irrigation_cost_usd_per_acre"] * yield_summary["total_acres"], 2
+    )
+    assert row["irrigation_cost_total_usd"] == water_summary["irrigation_cost_total_usd"]
+
+
+def test_composite_run_rejects_unconsumable_dependency(client):
+    payload = {
+        "region": "IA-Central",
+        "year": 2012,
+        "steps": [
+            {"step_id": "water", "model_id": "water_risk"},
+            {"step_id": "yield", "model_id": "crop_yield_predictor", "depends_on": ["water"]},
+        ],
+    }
+    r = client.post("/api/runs/composite", json=payload)
+    assert r.status_code == 422
+    assert "cannot consume" in r.json()["detail"]
+
+
+def test_composite_run_rejects_cycles(client):
+    payload = {
+        "region": "IA-Central",
+        "year": 2012,
+        "steps": [
+            {"step_id": "a", "model_id": "crop_yield_predictor", "depends_on": ["b"]},
+            {"step_id": "b", "model_id": "water_risk", "depends_on": ["a"]},
+        ],
+    }
+    r = client.post("/api/runs/composite", json=payload)
+    assert r.status_code == 422
+    assert "cycle" in r.json()["detail"]
+
+
+def test_single_run_rejects_composite_sentinel(client):
+    payload = {"model_id": "composite", "region": "IA-Central", "year": 2012}
+    assert client.post("/api/runs", json=payload).status_code == 400
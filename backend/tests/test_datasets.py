@@ -0,0 +1,75 @@
+import shutil
+
+
+def _copy_yield_csv(tmp_path):
+    from backend import datasets
+
+    csv_path = tmp_path / "yield_data.csv"
+    shutil.copy(datasets.YIELD_CSV_PATH, csv_path)
+    return csv_path
+
+
+def _append_row(csv_path, year):
+    with open(csv_path, "a") as f:
+        f.write(f"ZZ-Test,{year},100.0,200.0\n")
+
+
+def test_refresh_publishes_new_version_and_keeps_old_mapping(tmp_path):
+    from backend import datasets
+
+    csv_path = _copy_yield_csv(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    old = datasets.attach(csv_path, cache_dir)  # cold cache: bootstraps a publish
+    old_rows = datasets.select_rows(old, "IA-Central", 2010)
+    assert len(old_rows) == 1
+    assert datasets.current_version(csv_path, cache_dir) == datasets.publish(csv_path, cache_dir)
+
+    _append_row(csv_path, 2030)
+    # readers never republish; the refresh is picked up once the loader publishes it
+    assert len(datasets.select_rows(datasets.attach(csv_path, cache_dir), "ZZ-Test", 2030)) == 0
+    datasets.publish(csv_path, cache_dir)
+    new = datasets.attach(csv_path, cache_dir)
+
+    assert len(datasets.select_rows(new, "ZZ-Test", 2030)) == 1
+    assert len(datasets.select_rows(old, "ZZ-Test", 2030)) == 0
+    assert float(old_rows["acres"][0]) > 0  # old mapping still readable after the swap
+    assert len(list(cache_dir.glob("yield_data.*.npy"))) == 2
+    assert not list(cache_dir.glob("*.tmp"))
+    # the superseded mapping is evicted from the per-process cache
+    assert datasets._MAPPED["yield_data"][0] == str(datasets.current_version(csv_path, cache_dir))
+
+
+def test_pinned_version_survives_pruning(tmp_path):
+    from backend import datasets
+
+    csv_path = _copy_yield_csv(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    pinned, pin_path = datasets.pin_current(csv_path, cache_dir)
+    for year in (2030, 2031, 2032):
+        _append_row(csv_path, year)
+        datasets.publish(csv_path, cache_dir)
+    assert pinned.exists()
+    assert len(list(cache_dir.glob("yield_data.*.npy"))) == datasets.KEEP_VERSIONS + 1
+
+    datasets.unpin(pin_path)
+    _append_row(csv_path, 2033)
+    datasets.publish(csv_path, cache_dir)
+    assert not pinned.exists()
+    assert len(list(cache_dir.glob("yield_data.*.npy"))) == datasets.KEEP_VERSIONS
+
+
+def test_pins_of_dead_processes_are_ignored(tmp_path, monkeypatch):
+    from backend import datasets
+
+    csv_path = _copy_yield_csv(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    pinned = datasets.publish(csv_path, cache_dir)
+    stale_pin = pinned.with_name(f"{pinned.name}.999999999-deadbeef.pin")
+    stale_pin.touch()
+    for year in (2030, 2031):
+        _append_row(csv_path, year)
+        datasets.publish(csv_path, cache_dir)
+    assert not pinned.exists() and not stale_pin.exists()
@@ -0,0 +1,87 @@
+import asyncio
+import pstats
+
+
+def test_profiled_run_exposes_trace(client, tmp_path, monkeypatch):
+    import backend.profiling as profiling
+    import backend.runner as runner
+    from backend.db import create_run
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(runner, "STEP_DELAY", 0)
+
+    params = {"region": "IA-Central", "year": 2010}
+    run_id = create_run("crop_yield_predictor", "scientist@corteva.internal", params)
+    asyncio.run(runner.execute_model_async(run_id, "crop_yield_predictor", params, profile=True))
+
+    r = client.get(f"/api/runs/{run_id}/profile")
+    assert r.status_code == 200
+    dump = tmp_path / "downloaded.prof"
+    dump.write_bytes(r.content)
+    assert pstats.Stats(str(dump)).total_calls > 0
+
+    r = client.get(f"/api/runs/{run_id}/profile", params={"format": "collapsed"})
+    assert r.status_code == 200
+    lines = r.text.strip().splitlines()
+    assert any("_lookup_yield" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert all(line.rsplit(" ", 1)[0].count(";") <= 1 for line in lines)
+
+
+def test_old_profiles_are_pruned(tmp_path, monkeypatch):
+    import cProfile
+    import os
+    import backend.profiling as profiling
+    from backend.models.db_models import Run
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_RETENTION", 2)
+    runs = [Run(id=run_id, model_id="water_risk", user_id="u", status="succeeded") for run_id in (1, 2, 3)]
+    for run in runs:
+        path = profiling.save_profile(run, cProfile.Profile())
+        os.utime(path, (run.id, run.id))
+
+    assert sorted(tmp_path.glob("run_*.prof")) == sorted(profiling.profile_path(r) for r in runs[1:])
+
+
+def test_reused_run_id_does_not_serve_old_profile(tmp_path, monkeypatch):
+    import cProfile
+    from datetime import datetime
+    import backend.profiling as profiling
+    from backend.models.db_models import Run
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    old = Run(id=1, model_id="water_risk", user_id="u", status="succeeded", created_at=datetime(2025, 1, 1))
+    reused = Run(id=1, model_id="water_risk", user_id="v", status="queued", created_at=datetime(2025, 6, 1))
+    profiling.save_profile(old, cProfile.Profile())
+    assert not profiling.profile_path(reused).exists()
+
+
+def test_section_falls_back_when_another_profiler_is_active(monkeypatch):
+    import cProfile
+    import backend.profiling as profiling
+
+    prof = cProfile.Profile()
+
+    def busy():
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(prof, "enable", busy)
+    with profiling.section(prof):
+        ran = True
+    assert ran
+
+
+def test_unprofiled_run_has_no_trace(client, tmp_path, monkeypatch):
+    import backend.profiling as profiling
+    import backend.runner as runner
+    from backend.db import create_run
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(runner, "STEP_DELAY", 0)
+
+    params = {"region": "IA-Central", "year": 2010}
+    run_id = create_run("water_risk", "scientist@corteva.internal", params)
+    asyncio.run(runner.execute_model_async(run_id, "water_risk", params))
+
+    assert client.get(f"/api/runs/{run_id}/profile").status_code == 404
@@ -0,0 +1,188 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+PAYLOAD = {"model_id": "crop_yield_predictor", "region": "IA-Central", "year": 2010}
+
+
+def _no_active_runs(user_id, model_id):
+    return 0
+
+
+def test_user_bucket_throttles_with_retry_after(client, monkeypatch):
+    import backend.main as main
+    from backend.scheduler import RunLimits, RunScheduler
+
+    limits = RunLimits(user_rate_per_min=6, user_burst=2, global_rate_per_min=0, max_active_per_user=100)
+    monkeypatch.setattr(main, "scheduler", RunScheduler(default_limits=limits, model_limits={}))
+
+    assert client.post("/api/runs", json=PAYLOAD).status_code == 200
+    assert client.post("/api/runs", json=PAYLOAD).status_code == 200
+    r = client.post("/api/runs", json=PAYLOAD)
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "10"
+
+
+def test_user_bucket_is_shared_across_models():
+    from backend.scheduler import RunLimits, RunScheduler
+
+    limits = RunLimits(user_rate_per_min=6, user_burst=1, global_rate_per_min=0)
+    sched = RunScheduler(
+        default_limits=limits, model_limits={}, clock=lambda: 0.0, active_runs=_no_active_runs
+    )
+
+    sched.admit("a", "crop_yield_predictor")
+    with pytest.raises(HTTPException) as exc:
+        sched.admit("a", "water_risk")
+    assert exc.value.status_code == 429
+    sched.admit("b", "water_risk")  # other users have their own bucket
+
+
+def test_global_bucket_is_process_wide():
+    from backend.scheduler import RunLimits, RunScheduler
+
+    limits = RunLimits(user_rate_per_min=0, global_rate_per_min=6, global_burst=1)
+    sched = RunScheduler(
+        default_limits=limits, model_limits={}, clock=lambda: 0.0, active_runs=_no_active_runs
+    )
+
+    sched.admit("a", "crop_yield_predictor")
+    with pytest.raises(HTTPException) as exc:
+        sched.admit("b", "water_risk")
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "10"
+
+
+def test_active_cap_counts_runs_table_per_user(client):
+    from backend.db import create_run, update_run_status
+    from backend.scheduler import RunLimits, RunScheduler, model_override
+
+    defaults = RunLimits(max_active_per_user=2)
+    sched = RunScheduler(
+        default_limits=defaults,
+        model_limits={"water_risk": model_override(defaults, max_active_per_user=1)},
+    )
+    user = "a@corteva.internal"
+    water = create_run("water_risk", user, {})
+
+    with pytest.raises(HTTPException) as exc:
+        sched.admit(user, "water_risk")  # per-model override applies on top
+    assert exc.value.status_code == 429
+    sched.admit(user, "crop_yield_predictor")
+
+    create_run("crop_yield_predictor", user, {})
+    with pytest.raises(HTTPException):
+        sched.admit(user, "crop_yield_predictor")  # user cap spans models
+    sched.admit("b@corteva.internal", "crop_yield_predictor")
+
+    update_run_status(water, "succeeded")
+    sched.admit(user, "crop_yield_predictor")
+
+
+def test_fair_share_interleaves_users():
+    from backend.scheduler import RunLimits, RunScheduler
+
+    sched = RunScheduler(default_limits=RunLimits(), model_limits={}, max_concurrent=1)
+    started = []
+
+    def job(name):
+        async def run():
+            started.append(name)
+            await asyncio.sleep(0)
+        return run
+
+    async def scenario():
+        for name in ("a1", "a2", "a3"):
+            sched.submit("a", job(name))
+        sched.submit("b", job("b1"))
+        while sched._running or sched.queued:
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert started == ["a1", "b1", "a2", "a3"]
+
+
+def test_full_queue_sheds_load():
+    from backend.scheduler import RunLimits, RunScheduler
+
+    sched = RunScheduler(
+        default_limits=RunLimits(), model_limits={}, max_concurrent=0, max_queued=1,
+        active_runs=_no_active_runs,
+    )
+
+    async def scenario():
+        sched.submit("a", job=lambda: asyncio.sleep(0))
+        with pytest.raises(HTTPException) as exc:
+            sched.admit("b", "m")
+        return exc.value.status_code, exc.value.headers["Retry-After"]
+
+    assert asyncio.run(scenario()) == (503, "5")
+
+
+def test_failed_model_run_releases_active_slot(client, monkeypatch):
+    import backend.runner as runner
+    from backend.db import count_active_runs, create_run, get_run_by_id
+
+    def broken(*args):
+        raise RuntimeError("model blew up")
+
+    monkeypatch.setattr(runner, "STEP_DELAY", 0)
+    monkeypatch.setattr(runner, "_compute_model", broken)
+    user = "scientist@corteva.internal"
+    run_id = create_run("water_risk", user, PAYLOAD)
+    asyncio.run(runner.execute_model_async(run_id, "water_risk", PAYLOAD))
+
+    assert get_run_by_id(run_id).status == "failed"
+    assert client.get(f"/api/runs/{run_id}/results").json()["summaryMetrics"]["error"] == "model blew up"
+    assert count_active_runs(user) == 0
+
+
+def test_runs_of_dead_processes_are_failed_at_startup(client):
+    import os
+    import socket
+    from sqlmodel import Session
+    import backend.db as db
+    from backend.models.db_models import Run
+
+    user = "scientist@corteva.internal"
+    live = db.create_run("water_risk", user, {})
+    dead = db.create_run("water_risk", user, {})
+    elsewhere = db.create_run("water_risk", user, {})
+    finished = db.create_run("water_risk", user, {})
+    db.update_run_status(finished, "succeeded")
+    with Session(db.engine) as session:
+        for run_id, worker_id in ((dead, f"{socket.gethostname()}:999999999"), (elsewhere, f"old-container:{os.getpid()}")):
+            run = session.get(Run, run_id)
+            run.worker_id = worker_id
+            session.add(run)
+        session.commit()
+
+    assert db.fail_orphaned_runs() == 2
+    statuses = {r.id: r.status for r in db.get_run_statuses(user)}
+    assert statuses == {live: "queued", dead: "failed", elsewhere: "failed", finished: "succeeded"}
+
+
+def test_idle_buckets_and_served_users_are_evicted():
+    from backend.scheduler import BUCKET_SWEEP_INTERVAL, RunLimits, RunScheduler
+
+    now = [0.0]
+    limits = RunLimits(user_rate_per_min=60, user_burst=5, global_rate_per_min=0)
+    sched = RunScheduler(
+        default_limits=limits, model_limits={}, clock=lambda: now[0], active_runs=_no_active_runs
+    )
+    for i in range(100):
+        sched.admit(f"rotating-{i}", "water_risk")
+    assert len(sched._buckets) == 100
+
+    now[0] += BUCKET_SWEEP_INTERVAL
+    sched.admit("steady", "water_risk")
+    assert list(sched._buckets) == [("user", "steady")]
+
+    async def scenario():
+        sched.submit("steady", lambda: asyncio.sleep(0))
+        while sched._running or sched.queued:
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert sched._last_served == {} and not sched._running_by_user
@@ -0,0 +1,106 @@
+import asyncio
+import os
+
+
+def test_grid_chunks_cover_every_point():
+    from backend.runner import _iter_grid_chunks
+
+    grid = {"region": ["IA-Central", "IL-Central"], "year": [2010, 2011, 2012]}
+    chunks = list(_iter_grid_chunks(grid, chunk_size=4))
+    assert [len(c) for c in chunks] == [4, 2]
+    assert {"region": "IL-Central", "year": 2012} in chunks[1]
+
+
+def test_memmap_lookup_matches_csv_scan(tmp_path):
+    import csv
+    from backend.datasets import YIELD_CSV_PATH, publish
+    from backend.runner import _run_yield_scenario_chunk
+
+    npy_path = publish(YIELD_CSV_PATH, cache_dir=tmp_path)
+    points = [
+        {"region": "IA-Central", "year": 2010, "acreage_multiplier": 2.0},
+        {"region": "Nowhere", "year": 2010},
+    ]
+    rows = _run_yield_scenario_chunk(str(npy_path), points)
+
+    with open(YIELD_CSV_PATH, newline="") as f:
+        [src] = [r for r in csv.DictReader(f) if r["region"] == "IA-Central" and r["year"] == "2010"]
+    assert rows[0]["avg_yield_bu_acre"] == round(float(src["expected_yield_bu_acre"]), 2)
+    assert rows[0]["total_acres"] == int(float(src["acres"])) * 2
+    assert rows[1]["total_bu"] == 0.0
+
+
+def test_scenario_run_streams_chunks(client, tmp_path, monkeypatch):
+    import backend.runner as runner
+    from backend.db import create_run, get_run_by_id
+
+    monkeypatch.setattr(runner, "SCENARIO_WORKERS", 2)
+
+    grid = {"region": ["IA-Central", "OH-Central"], "year": list(range(2010, 2021))}
+    run_id = create_run("crop_yield_predictor", "scientist@corteva.internal", {"grid": grid})
+    asyncio.run(runner.execute_scenario_async(run_id, "crop_yield_predictor", grid, chunk_size=5))
+
+    assert get_run_by_id(run_id).status == "succeeded"
+    assert not list(runner.datasets.CACHE_DIR.glob("*.pin"))  # the sweep released its version
+    body = client.get(f"/api/runs/{run_id}/results").json()
+    assert body["summaryMetrics"]["points_done"] == 22
+    assert body["summaryMetrics"]["chunks_done"] == 5
+    assert len(body["table"]) == 22
+    assert body["nextOffset"] is None
+
+    page = client.get(f"/api/runs/{run_id}/results", params={"offset": 1, "limit": 2}).json()
+    assert len(page["table"]) == 10
+    assert page["nextOffset"] == 3
+
+
+def test_failing_chunk_fails_run_without_blocking(client):
+    import backend.runner as runner
+    from backend.db import create_run, get_run_by_id
+
+    grid = {"region": ["IA-Central"], "year": ["not-a-year"]}
+    run_id = create_run("crop_yield_predictor", "scientist@corteva.internal", {"grid": grid})
+    asyncio.run(runner.execute_scenario_async(run_id, "crop_yield_predictor", grid))
+
+    assert get_run_by_id(run_id).status == "failed"
+    body = client.get(f"/api/runs/{run_id}/results").json()
+    assert "not-a-year" in body["summaryMetrics"]["error"]
+
+
+def test_scenario_rejects_unsupported_model(client):
+    payload = {"model_id": "water_risk", "grid": {"region": ["IA-Central"], "year": [2010]}}
+    r = client.post("/api/scenarios", json=payload)
+    assert r.status_code == 400
+
+
+def test_scenario_rejects_oversized_chunk_size(client):
+    from backend.runner import SCENARIO_CHUNK_SIZE_MAX
+
+    payload = {
+        "model_id": "crop_yield_predictor",
+        "grid": {"region": ["IA-Central"], "year": [2010]},
+        "chunk_size": SCENARIO_CHUNK_SIZE_MAX + 1,
+    }
+    r = client.post("/api/scenarios", json=payload)
+    assert r.status_code == 422
+
+
+def _crash_worker(npy_path, points):
+    os._exit(1)
+
+
+def test_dead_worker_does_not_break_later_sweeps(client, monkeypatch):
+    import backend.runner as runner
+    from backend.db import create_run, get_run_by_id
+
+    grid = {"region": ["IA-Central"], "year": [2010]}
+    dataset, run_chunk = runner.SCENARIO_MODELS["crop_yield_predictor"]
+
+    monkeypatch.setitem(runner.SCENARIO_MODELS, "crop_yield_predictor", (dataset, _crash_worker))
+    crashed = create_run("crop_yield_predictor", "scientist@corteva.internal", {"grid": grid})
+    asyncio.run(runner.execute_scenario_async(crashed, "crop_yield_predictor", grid))
+    assert get_run_by_id(crashed).status == "failed"
+
+    monkeypatch.setitem(runner.SCENARIO_MODELS, "crop_yield_predictor", (dataset, run_chunk))
+    healthy = create_run("crop_yield_predictor", "scientist@corteva.internal", {"grid": grid})
+    asyncio.run(runner.execute_scenario_async(healthy, "crop_yield_predictor", grid))
+    assert get_run_by_id(healthy).status == "succeeded"
@@ -0,0 +1,22 @@
+import pathlib
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+
+
+def test_import_does_not_load_heavy_modules():
+    code = (
+        "import sys, backend.main; "
+        "print(sorted(m for m in ('pandas', 'numpy') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_lifespan_seeds_models(client):
+    with client:
+        r = client.get("/api/models")
+    assert {m["model_id"] for m in r.json()} == {"crop_yield_predictor", "water_risk"}